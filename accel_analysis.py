@@ -0,0 +1,214 @@
+# accel_analysis.py
+from datetime import datetime, timezone
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 링버퍼 크기: 100Hz 기준 60초
+RING_CAPACITY = 6000
+
+# 분석 파라미터 (가속도 단위: g)
+WINDOW_SECONDS = 4.0        # 슬라이딩 윈도우 길이
+STEP_SECONDS = 1.0          # 윈도우 이동 간격
+MAX_SAMPLE_RATE = 200.0     # 재샘플링 상한 (Hz)
+MIN_SAMPLE_RATE = 5.0       # 이보다 낮으면 보행 분석 불가
+CADENCE_BAND = (0.5, 3.0)   # 보행 주파수 대역 (Hz)
+CADENCE_MIN_POWER = 0.3     # 보행 대역 에너지 비율이 이 이상일 때만 보행으로 판단
+FREEFALL_G = 0.5            # 자유낙하 구간
+IMPACT_G = 2.5              # 충격
+FALL_WINDOW_SECONDS = 1.0   # 자유낙하 → 충격 허용 간격
+
+
+def to_epoch(timestamp: datetime) -> float:
+    # DB와 같은 naive UTC 기준
+    return timestamp.replace(tzinfo=timezone.utc).timestamp()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return datetime.fromtimestamp(float(seconds), tz=timezone.utc).replace(tzinfo=None)
+
+
+class RawAccelBuffer:
+    """
+    워커 하나의 원시 3축 샘플 링버퍼 (시간: float64, 축: float32)
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        self.capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self._head = 0   # 다음에 쓸 위치
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, t, xyz):
+        t = np.asarray(t, dtype=np.float64)
+        xyz = np.asarray(xyz, dtype=np.float32).reshape(-1, 3)
+        n = len(t)
+        if n == 0:
+            return
+        if self._size and t[0] < self._t[(self._head - 1) % self.capacity]:
+            # 늦게 도착한 샘플: 기존 샘플과 시간순으로 병합해 다시 씀 (snapshot/재샘플링은 시간순 가정)
+            old_t, old_xyz = self.snapshot()
+            t = np.concatenate([old_t, t])
+            xyz = np.concatenate([old_xyz, xyz])
+            order = np.argsort(t, kind="stable")
+            t, xyz, n = t[order], xyz[order], len(t)
+            self._head = self._size = 0
+        # 용량보다 많으면 최신 샘플만 보관
+        if n > self.capacity:
+            t, xyz, n = t[-self.capacity:], xyz[-self.capacity:], self.capacity
+
+        idx = (self._head + np.arange(n)) % self.capacity
+        self._t[idx] = t
+        self._xyz[idx] = xyz
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def append(self, timestamp: datetime, ax: float, ay: float, az: float):
+        self.extend([to_epoch(timestamp)], [(ax, ay, az)])
+
+    def snapshot(self, seconds: float = None):
+        """
+        시간순 복사본 (t, xyz) 반환, seconds가 있으면 최근 구간만
+        """
+        start = (self._head - self._size) % self.capacity
+        idx = (start + np.arange(self._size)) % self.capacity
+        t, xyz = self._t[idx], self._xyz[idx]
+        if seconds is not None and self._size:
+            keep = t >= t[-1] - seconds
+            t, xyz = t[keep], xyz[keep]
+        return t, xyz
+
+
+class AccelBufferStore:
+    """
+    (user_id, walker_id)별 링버퍼 보관소
+    """
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+
+    def get(self, user_id: str, walker_id: str):
+        return self._buffers.get((user_id, walker_id))
+
+    def _buffer(self, user_id: str, walker_id: str) -> RawAccelBuffer:
+        key = (user_id, walker_id)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = RawAccelBuffer(self.capacity)
+        return buffer
+
+    def append(self, user_id: str, walker_id: str, timestamp: datetime, ax: float, ay: float, az: float):
+        self._buffer(user_id, walker_id).append(timestamp, ax, ay, az)
+
+    def extend(self, user_id: str, walker_id: str, timestamps, xyz):
+        t = np.fromiter((to_epoch(ts) for ts in timestamps), dtype=np.float64, count=len(timestamps))
+        self._buffer(user_id, walker_id).extend(t, xyz)
+
+
+def _resample(t, xyz):
+    """
+    불규칙 간격 샘플을 중앙값 간격 기준 균일 격자로 보간
+    """
+    dt = np.diff(t)
+    dt = dt[dt > 0]
+    if len(dt) == 0:
+        return None, None, 0.0
+    fs = min(1.0 / float(np.median(dt)), MAX_SAMPLE_RATE)
+    grid = np.arange(t[0], t[-1] + 1e-9, 1.0 / fs)
+    # 같은 시각 중복 샘플은 np.interp 입력에서 제외
+    unique = np.concatenate(([True], np.diff(t) > 0))
+    tu, xu = t[unique], xyz[unique]
+    resampled = np.stack([np.interp(grid, tu, xu[:, i]) for i in range(3)], axis=1)
+    return grid, resampled, fs
+
+
+def _detect_falls(grid, mag, fs):
+    # 충격 직전 FALL_WINDOW_SECONDS 안에 자유낙하 구간이 있으면 낙상
+    impact_idx = np.flatnonzero((mag[1:] >= IMPACT_G) & (mag[:-1] < IMPACT_G)) + 1
+    if len(impact_idx) == 0:
+        return []
+    freefall_cum = np.concatenate(([0], np.cumsum(mag < FREEFALL_G)))
+    lookback = max(int(round(FALL_WINDOW_SECONDS * fs)), 1)
+    start_idx = np.maximum(impact_idx - lookback, 0)
+    has_freefall = (freefall_cum[impact_idx] - freefall_cum[start_idx]) > 0
+    return [
+        {"timestamp": from_epoch(grid[i]).isoformat(), "impact_g": round(float(mag[i]), 3)}
+        for i in impact_idx[has_freefall]
+    ]
+
+
+def analyze(t, xyz, window_seconds: float = WINDOW_SECONDS, step_seconds: float = STEP_SECONDS):
+    """
+    슬라이딩 윈도우별 보행 케이던스, 저크, 낙상 이벤트 계산
+    """
+    if len(t) < 2:
+        return None
+    grid, resampled, fs = _resample(np.asarray(t), np.asarray(xyz, dtype=np.float64))
+    if grid is None or fs < MIN_SAMPLE_RATE:
+        return None
+
+    mag = np.sqrt(np.einsum("ij,ij->i", resampled, resampled))
+
+    # 저크: 3축 미분의 크기 (g/s)
+    jerk = np.diff(resampled, axis=0) * fs
+    jerk_mag = np.sqrt(np.einsum("ij,ij->i", jerk, jerk))
+
+    falls = _detect_falls(grid, mag, fs)
+
+    win = int(round(window_seconds * fs))
+    step = max(int(round(step_seconds * fs)), 1)
+    if len(jerk_mag) < win or win < 4:
+        return {
+            "sample_rate": round(fs, 2),
+            "sample_count": int(len(t)),
+            "windows": [],
+            "cadence_spm": None,
+            "falls": falls,
+        }
+
+    # (윈도우 수, 윈도우 길이) 뷰로 한 번에 계산
+    mag_windows = sliding_window_view(mag[:len(jerk_mag)], win)[::step]
+    jerk_windows = sliding_window_view(jerk_mag, win)[::step]
+    starts = np.arange(len(mag_windows)) * step
+
+    detrended = mag_windows - mag_windows.mean(axis=1, keepdims=True)
+    power = np.abs(np.fft.rfft(detrended * np.hanning(win), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(win, d=1.0 / fs)
+    band = (freqs >= CADENCE_BAND[0]) & (freqs <= CADENCE_BAND[1])
+    total_power = power[:, 1:].sum(axis=1)
+    band_power = power[:, band]
+    band_ratio = np.divide(band_power.sum(axis=1), total_power, out=np.zeros(len(power)), where=total_power > 0)
+    dominant = freqs[band][np.argmax(band_power, axis=1)]
+    walking = band_ratio >= CADENCE_MIN_POWER
+    # 가속도 크기는 한 걸음마다 한 번 정점 → 주파수 × 60 = 분당 걸음 수
+    cadence = np.where(walking, dominant * 60.0, 0.0)
+
+    jerk_rms = np.sqrt((jerk_windows ** 2).mean(axis=1))
+    jerk_max = jerk_windows.max(axis=1)
+
+    windows = [
+        {
+            "start": from_epoch(grid[s]).isoformat(),
+            "end": from_epoch(grid[s + win - 1]).isoformat(),
+            "cadence_spm": round(float(c), 1),
+            "jerk_rms": round(float(jr), 3),
+            "jerk_max": round(float(jm), 3),
+        }
+        for s, c, jr, jm in zip(starts, cadence, jerk_rms, jerk_max)
+    ]
+
+    return {
+        "sample_rate": round(fs, 2),
+        "sample_count": int(len(t)),
+        "windows": windows,
+        "cadence_spm": round(float(np.median(cadence[walking])), 1) if walking.any() else 0.0,
+        "falls": falls,
+    }
+
+
+# 프로세스 공용 인스턴스
+accel_buffers = AccelBufferStore()
@@ -0,0 +1,194 @@
+# activity_segmenter.py
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from model.models import Activity, AccelerometerData
+from report_cache import report_cache
+from rollups import add_activity_daily
+
+logger = logging.getLogger(__name__)
+
+# 움직임이 이만큼 없으면 자동 활동 종료 (마지막 움직임 시각으로 종료)
+IDLE_GAP = timedelta(seconds=int(os.getenv("ACTIVITY_IDLE_GAP_SECONDS", 180)))
+# 이보다 짧은 자동 활동은 기록하지 않음 (잠깐 밀린 워커 등)
+MIN_SESSION = timedelta(seconds=int(os.getenv("ACTIVITY_MIN_SECONDS", 60)))
+SWEEP_INTERVAL_SECONDS = 30   # 센서가 끊긴 자동 활동 정리 주기
+
+
+class OpenSession:
+    __slots__ = ("activity_id", "start_time", "last_moving", "manual")
+
+    def __init__(self, activity_id: int, start_time: datetime, last_moving: datetime, manual: bool):
+        self.activity_id = activity_id
+        self.start_time = start_time
+        self.last_moving = last_moving
+        self.manual = manual     # /activity/start 로 시작된 활동은 자동 종료하지 않음
+
+
+class ActivitySegmenter:
+    """
+    is_moving 판정으로 워커별 활동을 자동으로 시작/종료
+    - 열린 활동을 메모리에 보관해 샘플당 O(1), DB는 시작/종료 시에만 사용
+    - /activity/start, /activity/stop 과 같은 상태를 공유 (수동 활동은 자동 종료 안 함)
+    """
+
+    def __init__(self, idle_gap: timedelta = IDLE_GAP, min_session: timedelta = MIN_SESSION):
+        self.idle_gap = idle_gap
+        self.min_session = min_session
+        self._sessions = {}   # (user_id, walker_id) → OpenSession, 열린 활동이 없으면 None
+        self._lock = asyncio.Lock()
+
+    async def _load(self, db: AsyncSession, user_id: str, walker_id: str):
+        result = await db.execute(
+            select(Activity)
+            .where(Activity.user_id == user_id)
+            .where(Activity.walker_id == walker_id)
+            .where(Activity.end_time == None)
+            .order_by(Activity.start_time.desc())
+            .limit(1)
+        )
+        activity = result.scalar()
+        if activity is None:
+            return None
+
+        manual = activity.source != "auto"
+        last_moving = activity.start_time
+        if not manual:
+            # 재시작 후에는 마지막 움직임 시각을 원시 데이터에서 복원
+            result = await db.execute(
+                select(func.max(AccelerometerData.timestamp))
+                .where(AccelerometerData.user_id == user_id)
+                .where(AccelerometerData.walker_id == walker_id)
+                .where(AccelerometerData.is_moving == 1)
+                .where(AccelerometerData.timestamp >= activity.start_time)
+            )
+            last_moving = result.scalar() or activity.start_time
+        return OpenSession(activity.id, activity.start_time, last_moving, manual)
+
+    async def current(self, db: AsyncSession, user_id: str, walker_id: str):
+        """
+        열린 활동 반환 (없으면 None), 처음 보는 워커만 DB 조회
+        """
+        key = (user_id, walker_id)
+        if key not in self._sessions:
+            session = await self._load(db, user_id, walker_id)
+            self._sessions.setdefault(key, session)
+        return self._sessions[key]
+
+    def track(self, user_id: str, walker_id: str, session):
+        # 수동 시작/종료 결과 반영
+        self._sessions[(user_id, walker_id)] = session
+
+    async def observe(self, db: AsyncSession, user_id: str, walker_id: str, timestamp: datetime, is_moving: int):
+        await self.observe_many(db, user_id, walker_id, [timestamp], [is_moving])
+
+    async def observe_many(self, db: AsyncSession, user_id: str, walker_id: str, timestamps, flags):
+        """
+        시간순 (timestamp, is_moving) 반영
+        - 수신 데이터는 이미 커밋된 뒤 호출되므로 오류는 기록만 하고 호출 측으로 올리지 않음
+        """
+        key = (user_id, walker_id)
+        try:
+            session = await self.current(db, user_id, walker_id)
+            for timestamp, moving in zip(timestamps, flags):
+                if session is not None and not session.manual and timestamp - session.last_moving >= self.idle_gap:
+                    session = await self._close(key, session)
+                if not moving:
+                    continue
+                if session is None:
+                    session = await self._open(key, timestamp)
+                elif timestamp > session.last_moving:
+                    session.last_moving = timestamp
+        except Exception as e:
+            logger.error(f"❌ 활동 자동 분할 실패 ({user_id}, {walker_id}): {e}")
+
+    async def _open(self, key, start_time: datetime):
+        user_id, walker_id = key
+        async with self._lock:
+            current = self._sessions.get(key)
+            if current is not None:
+                # 다른 요청이 먼저 열었음
+                return current
+            try:
+                async with async_session() as db:
+                    activity = Activity(user_id=user_id, walker_id=walker_id, start_time=start_time, source="auto")
+                    db.add(activity)
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"❌ 자동 활동 시작 실패 ({user_id}, {walker_id}): {e}")
+                return None
+            session = OpenSession(activity.id, start_time, start_time, manual=False)
+            self._sessions[key] = session
+
+        report_cache.invalidate(user_id)
+        logger.info(f"🚶 자동 활동 시작: {user_id} / {walker_id} ({start_time})")
+        return session
+
+    async def _close(self, key, session: OpenSession):
+        """
+        마지막 움직임 시각으로 종료, 너무 짧으면 삭제 (실패 시 열린 상태 유지 후 재시도)
+        """
+        user_id, walker_id = key
+        async with self._lock:
+            if self._sessions.get(key) is not session:
+                # 이미 종료/교체됨 (수동 종료, 정리 작업 등)
+                return self._sessions.get(key)
+            end_time = session.last_moving
+            duration = int((end_time - session.start_time).total_seconds() / 60)
+            try:
+                async with async_session() as db:
+                    if end_time - session.start_time < self.min_session:
+                        await db.execute(
+                            delete(Activity)
+                            .where(Activity.id == session.activity_id)
+                            .where(Activity.end_time == None)
+                        )
+                    else:
+                        result = await db.execute(
+                            update(Activity)
+                            .where(Activity.id == session.activity_id)
+                            .where(Activity.end_time == None)
+                            .values(end_time=end_time, duration=duration)
+                        )
+                        # 다른 프로세스에서 이미 종료한 활동은 집계에 더하지 않음
+                        if result.rowcount:
+                            await add_activity_daily(db, user_id, session.start_time, duration)
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"❌ 자동 활동 종료 실패 ({user_id}, {walker_id}): {e}")
+                return session
+            self._sessions[key] = None
+
+        report_cache.invalidate(user_id)
+        logger.info(f"🛑 자동 활동 종료: {user_id} / {walker_id} ({duration}분)")
+        return None
+
+    async def sweep(self, now: datetime = None):
+        """
+        센서 데이터가 끊겨 종료되지 못한 자동 활동 정리
+        """
+        cutoff = (now or datetime.utcnow()) - self.idle_gap
+        for key, session in list(self._sessions.items()):
+            if session is not None and not session.manual and session.last_moving <= cutoff:
+                await self._close(key, session)
+
+
+async def run_sweeper(segmenter: ActivitySegmenter, interval: float = SWEEP_INTERVAL_SECONDS):
+    """
+    백그라운드 정리 작업: interval마다 오래 멈춘 자동 활동 종료
+    """
+    logger.info("🚶 활동 자동 분할 정리 작업 시작됨")
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await segmenter.sweep()
+        except Exception as e:
+            logger.error(f"❌ 활동 정리 실패: {e}")
+
+
+# 프로세스 공용 인스턴스
+activity_segmenter = ActivitySegmenter()
@@ -0,0 +1,240 @@
+# backends.py
+import argparse
+import glob
+import logging
+import os
+import time
+import numpy as np
+from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+# 추론 백엔드: torch(기본, .pt 그대로) / onnx(ONNX Runtime) / openvino
+BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# int8 양자화 (onnx: 정적 양자화, INFERENCE_CALIB_IMAGES 이미지로 보정 / openvino: NNCF 보정, INFERENCE_CALIB_DATA 데이터셋 사용)
+INT8 = os.getenv("INFERENCE_INT8", "0") == "1"
+CALIB_DATA = os.getenv("INFERENCE_CALIB_DATA")
+CALIB_IMAGES = os.getenv("INFERENCE_CALIB_IMAGES", "uploads")
+CALIB_MAX_IMAGES = 200
+IMGSZ = 224
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def _is_stale(target: str, weights: str):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(weights)
+
+
+def _image_paths(directory: str):
+    return sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(directory, f"*.{ext}")))
+
+
+def _letterbox(frame, imgsz: int):
+    """
+    ultralytics 전처리와 같은 입력 텐서 (비율 유지 리사이즈 + 114 패딩, RGB, 0~1, NCHW float32)
+    """
+    import cv2
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * scale), round(w * scale)
+    resized = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1)[None]
+    return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+
+
+def _quantize_onnx(onnx_path: str, int8_path: str, imgsz: int, images: str = CALIB_IMAGES):
+    """
+    보정 이미지로 정적 int8 양자화 (QDQ, 가중치 채널별)
+    - 동적 양자화는 합성곱 위주 검출 모델에서 정확도 손실이 크고 CPU 속도 이점도 작음
+    """
+    import cv2
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    paths = _image_paths(images)[:CALIB_MAX_IMAGES]
+    if not paths:
+        raise FileNotFoundError(f"int8 보정 이미지 없음: {images}")
+    input_name = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            frames = (cv2.imread(p) for p in paths)
+            self._inputs = iter({input_name: _letterbox(frame, imgsz)} for frame in frames if frame is not None)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    quantize_static(
+        onnx_path, int8_path, FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def export(weights: str, backend: str = BACKEND, int8: bool = INT8, imgsz: int = IMGSZ):
+    """
+    .pt 가중치를 백엔드 형식으로 변환해 경로 반환 (변환본이 최신이면 재사용)
+    - 배치 추론을 위해 동적 배치 크기로 내보냄
+    """
+    if backend == "torch":
+        return weights
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown inference backend: {backend}")
+
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        onnx_path = f"{stem}.onnx"
+        if _is_stale(onnx_path, weights):
+            onnx_path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if not int8:
+            return onnx_path
+        int8_path = f"{stem}_int8.onnx"
+        if _is_stale(int8_path, onnx_path):
+            _quantize_onnx(onnx_path, int8_path, imgsz)
+        return int8_path
+
+    # openvino: 디렉토리 형식 ({stem}_openvino_model/, int8은 {stem}_int8_openvino_model/)
+    target = f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    if _is_stale(target, weights):
+        options = {"format": "openvino", "imgsz": imgsz, "dynamic": True, "int8": int8}
+        if int8 and CALIB_DATA:
+            options["data"] = CALIB_DATA
+        target = YOLO(weights).export(**options)
+    return target
+
+
+def _exported_task(path: str):
+    """
+    내보낸 모델 메타데이터의 task (detect/segment 등), 없으면 None (ultralytics가 추정)
+    - .pt를 다시 로드하지 않고 변환본에 기록된 값만 읽음
+    """
+    if os.path.isdir(path):
+        import yaml
+        metadata = os.path.join(path, "metadata.yaml")
+        if os.path.exists(metadata):
+            with open(metadata, encoding="utf-8") as f:
+                return (yaml.safe_load(f) or {}).get("task")
+        return None
+    import onnx
+    model = onnx.load(path, load_external_data=False)
+    return {prop.key: prop.value for prop in model.metadata_props}.get("task")
+
+
+def load_model(weights: str, backend: str = BACKEND, int8: bool = INT8):
+    """
+    백엔드 모델 로드 (변환/로드 실패 시 .pt + PyTorch로 대체)
+    - 어떤 백엔드든 ultralytics 모델 객체라 predict/names/결과 형식이 같음
+    """
+    if backend != "torch":
+        try:
+            path = export(weights, backend, int8)
+            model = YOLO(path, task=_exported_task(path))
+            logger.info(f"⚙️ 추론 백엔드: {backend}{' int8' if int8 else ''} ({path})")
+            return model
+        except Exception as e:
+            logger.warning(f"⚠️ {backend} 백엔드 사용 불가, PyTorch로 대체 ({weights}): {e}")
+
+    model = YOLO(weights)
+    model.fuse()
+    logger.info(f"⚙️ 추론 백엔드: torch ({weights})")
+    return model
+
+
+def _iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _detections(result):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4)), np.zeros(0, dtype=int), np.zeros(0)
+    return boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int), boxes.conf.cpu().numpy()
+
+
+def _timed_predict(model, frames, **kwargs):
+    model.predict(frames[:1], **kwargs)   # 워밍업 (첫 호출 초기화 비용 제외)
+    start = time.perf_counter()
+    results = [model.predict(frame, **kwargs)[0] for frame in frames]
+    return results, len(frames) / (time.perf_counter() - start)
+
+
+def check_parity(weights: str, backend: str, int8: bool, frames, conf: float = 0.3,
+                 imgsz: int = IMGSZ, iou_threshold: float = 0.5):
+    """
+    .pt 결과 대비 백엔드 결과 일치도와 처리량 비교
+    - 같은 클래스이고 IoU >= iou_threshold인 박스를 일치로 보고 recall/precision 계산
+    """
+    reference = YOLO(weights)
+    reference.fuse()
+    candidate = YOLO(export(weights, backend, int8, imgsz), task=reference.task)
+    options = {"conf": conf, "imgsz": imgsz, "device": "cpu", "verbose": False}
+
+    ref_results, ref_fps = _timed_predict(reference, frames, **options)
+    cand_results, cand_fps = _timed_predict(candidate, frames, **options)
+
+    matched = ref_total = cand_total = 0
+    conf_diffs = []
+    same_decision = 0
+    for ref, cand in zip(ref_results, cand_results):
+        ref_xyxy, ref_cls, ref_conf = _detections(ref)
+        cand_xyxy, cand_cls, cand_conf = _detections(cand)
+        ref_total += len(ref_cls)
+        cand_total += len(cand_cls)
+        same_decision += int((len(ref_cls) > 0) == (len(cand_cls) > 0))
+
+        used = np.zeros(len(cand_cls), dtype=bool)
+        for box, cls, score in zip(ref_xyxy, ref_cls, ref_conf):
+            if not len(cand_cls):
+                break
+            ious = np.where((cand_cls == cls) & ~used, _iou(box, cand_xyxy), 0)
+            best = int(np.argmax(ious))
+            if ious[best] >= iou_threshold:
+                used[best] = True
+                matched += 1
+                conf_diffs.append(abs(float(score) - float(cand_conf[best])))
+
+    return {
+        "weights": weights,
+        "backend": backend,
+        "int8": int8,
+        "frames": len(frames),
+        "recall": round(matched / ref_total, 4) if ref_total else 1.0,
+        "precision": round(matched / cand_total, 4) if cand_total else 1.0,
+        "detection_agreement": round(same_decision / len(frames), 4) if frames else 1.0,
+        "mean_conf_diff": round(float(np.mean(conf_diffs)), 4) if conf_diffs else 0.0,
+        "torch_fps": round(ref_fps, 2),
+        "backend_fps": round(cand_fps, 2),
+        "speedup": round(cand_fps / ref_fps, 2) if ref_fps else None,
+    }
+
+
+# 사용 예: python backends.py --weights obstacle_best.pt --backend onnx --int8 --images uploads
+if __name__ == "__main__":
+    import cv2
+
+    parser = argparse.ArgumentParser(description="추론 백엔드 변환 및 .pt 대비 정확도/속도 비교")
+    parser.add_argument("--weights", nargs="+", default=["obstacle_best.pt", "lane_seg_best.pt"])
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--images", default="uploads", help="비교에 사용할 이미지 디렉토리")
+    parser.add_argument("--conf", type=float, default=0.3)
+    args = parser.parse_args()
+
+    images = [frame for frame in (cv2.imread(p) for p in _image_paths(args.images)) if frame is not None]
+    if not images:
+        raise SystemExit(f"❌ 이미지 없음: {args.images}")
+
+    for weights in args.weights:
+        report = check_parity(weights, args.backend, args.int8, images, conf=args.conf)
+        print(report)
@@ -0,0 +1,77 @@
+# cache.py
+from collections import OrderedDict
+import time
+
+
+class LRUCache:
+    """
+    크기 제한 LRU 캐시 (가장 오래 사용되지 않은 항목부터 제거)
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+
+class TTLCache:
+    """
+    TTL + LRU 캐시 (만료되었거나 오래 사용되지 않은 항목 제거), 적중/미스 카운터 포함
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lru = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def get(self, key, default=None, valid=None):
+        """
+        valid: 값 검사 함수, False이면 만료된 항목처럼 제거하고 미스로 집계
+        """
+        entry = self._lru.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at and (valid is None or valid(value)):
+                self.hits += 1
+                return value
+            self._lru.pop(key)
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._lru.put(key, (time.monotonic() + self.ttl, value))
+
+    def pop(self, key, default=None):
+        entry = self._lru.pop(key)
+        return entry[1] if entry is not None else default
+
+    def clear(self):
+        self._lru.clear()
@@ -0,0 +1,147 @@
+# dashboard.py
+import logging
+from sqlalchemy import select, values, column, true, text, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from model.models import User, GPSData, HeartRate, AccelerometerData, ObstacleData, CrackData
+from utils import detect_abnormal_heartrate
+
+logger = logging.getLogger(__name__)
+
+# 대시보드 조회에 쓰는 (사용자, 시각) 인덱스 — 사용자별 최신값 LIMIT 1 조회용
+DASHBOARD_INDEXES = [
+    ("ix_gps_data_user_time", "gps_data", "user_id, timestamp DESC NULLS LAST"),
+    ("ix_heartrate_user_time", "heartrate", "user_id, recorded_at DESC NULLS LAST"),
+    ("ix_accelerometer_user_time", "accelerometer", "user_id, timestamp DESC NULLS LAST"),
+    ("ix_obstacles_user_time", "obstacles", "user_id, detection_time DESC NULLS LAST"),
+    ("ix_crack_user_time", "crack", "user_id, detection_time DESC NULLS LAST"),
+    # 사용자 기준 움직임 초 집계 (rollups.py) — 워커와 관계없이 (사용자, 초) 조회
+    ("ix_accel_rollup_1s_user_bucket", "accelerometer_rollup_1s", "user_id, bucket_start"),
+]
+
+
+
+async def create_dashboard_indexes(engine):
+    """
+    인덱스를 CREATE INDEX CONCURRENTLY로 생성 (트랜잭션 밖 autocommit 연결)
+    - 일반 CREATE INDEX는 생성하는 동안 SHARE 잠금으로 센서 INSERT를 모두 막음
+    - 이전 생성이 중단되어 INVALID로 남은 인덱스는 지우고 다시 생성
+    """
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for name, table, columns in DASHBOARD_INDEXES:
+                result = await conn.execute(text(
+                    "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                    "WHERE c.relname = :name"
+                ), {"name": name})
+                valid = result.scalar()
+                if valid:
+                    continue
+                if valid is False:
+                    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                logger.info(f"🗂️ 인덱스 생성 중: {name}")
+                await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"))
+    except Exception as e:
+        logger.error(f"❌ 대시보드 인덱스 생성 실패: {e}")
+
+
+async def _latest(db: AsyncSession, model, time_col, user_ids, *tiebreak):
+    """
+    사용자별 최신 행 1개씩 (사용자 목록에 LATERAL ... LIMIT 1 조인, 쿼리 1회)
+    - 사용자마다 (user_id, 시각) 인덱스를 한 번만 탐색 (DISTINCT ON은 해당 사용자 행을 모두 읽음)
+    """
+    ids = values(column("user_id", String(100)), name="dashboard_users").data([(u,) for u in user_ids])
+    latest = (
+        select(model)
+        .where(model.user_id == ids.c.user_id)
+        .order_by(time_col.desc().nulls_last(), *tiebreak)
+        .limit(1)
+        .lateral()
+    )
+    row = aliased(model, latest)
+    result = await db.execute(select(row).select_from(ids).join(latest, true()))
+    return {r.user_id: r for r in result.scalars().all()}
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _gps(row: GPSData):
+    return {
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "timestamp": _iso(row.timestamp),
+    }
+
+
+def _heartrate(row: HeartRate):
+    return {
+        "heartrate": row.heartrate,
+        "status": detect_abnormal_heartrate(row.heartrate),
+        "recorded_at": _iso(row.recorded_at),
+    }
+
+
+def _accelerometer(row: AccelerometerData):
+    return {
+        "walker_id": row.walker_id,
+        "accel_value": round(row.accel_value, 3),
+        "is_moving": row.is_moving,
+        "timestamp": _iso(row.timestamp),
+    }
+
+
+def _obstacle(row: ObstacleData):
+    return {
+        "obstacle_id": row.obstacle_id,
+        "walker_id": row.walker_id,
+        "obstacle_type": row.obstacle_type,
+        "detection_time": _iso(row.detection_time),
+        "is_detected": row.is_detected,
+    }
+
+
+def _pothole(row: CrackData):
+    return {
+        "crack_id": row.crack_id,
+        "walker_id": row.walker_id,
+        "crack_type": row.crack_type,
+        "detection_time": _iso(row.detection_time),
+        "is_detected": row.is_detected,
+    }
+
+
+async def build_dashboard(db: AsyncSession, user_ids):
+    """
+    여러 사용자의 최신 센서 상태를 한 번에 조회
+    - 센서별로 쿼리 1회씩 (사용자 수와 관계없이 고정 6회)
+    - 데이터가 없는 항목은 None
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return []
+
+    result = await db.execute(select(User).where(User.user_id.in_(user_ids)))
+    users = {u.user_id: u for u in result.scalars().all()}
+
+    gps = await _latest(db, GPSData, GPSData.timestamp, user_ids, GPSData.id.desc())
+    heartrate = await _latest(db, HeartRate, HeartRate.recorded_at, user_ids, HeartRate.id.desc())
+    accel = await _latest(db, AccelerometerData, AccelerometerData.timestamp, user_ids, AccelerometerData.id.desc())
+    obstacle = await _latest(db, ObstacleData, ObstacleData.detection_time, user_ids)
+    pothole = await _latest(db, CrackData, CrackData.detection_time, user_ids)
+
+    dashboard = []
+    for user_id in user_ids:
+        user = users.get(user_id)
+        dashboard.append({
+            "user_id": user_id,
+            "name": user.name if user else None,
+            "gps": _gps(gps[user_id]) if user_id in gps else None,
+            "heartrate": _heartrate(heartrate[user_id]) if user_id in heartrate else None,
+            "accelerometer": _accelerometer(accel[user_id]) if user_id in accel else None,
+            "obstacle": _obstacle(obstacle[user_id]) if user_id in obstacle else None,
+            "pothole": _pothole(pothole[user_id]) if user_id in pothole else None,
+        })
+    return dashboard
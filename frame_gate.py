@@ -0,0 +1,77 @@
+# frame_gate.py
+import os
+import time
+import cv2
+import numpy as np
+
+# 축소 프레임(회색조) 평균 밝기 차이가 이 값 미만이면 같은 장면으로 보고 추론 생략 (0~255)
+GATE_THRESHOLD = float(os.getenv("FRAME_GATE_THRESHOLD", 3.0))
+# 장면이 그대로여도 이 시간마다 한 번은 추론 (결과가 너무 오래되지 않도록)
+GATE_MAX_SKIP_SECONDS = float(os.getenv("FRAME_GATE_MAX_SKIP_SECONDS", 10))
+# 1이면 가속도 is_moving=1(이동 중)일 때는 비교 없이 항상 추론
+GATE_USE_MOTION = os.getenv("FRAME_GATE_USE_MOTION", "1") == "1"
+SIGNATURE_SIZE = (32, 32)
+
+
+def signature(frame):
+    """
+    비교용 축소 회색조 프레임 (32x32, float32)
+    """
+    small = cv2.resize(frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small.astype(np.float32)
+
+
+class FrameGate:
+    """
+    스트림별 변화 감지: 마지막으로 추론한 프레임과 거의 같으면 추론 생략
+    - 생략한 프레임은 직전 감지 결과를 그대로 유지 (DB에 새로 저장하지 않음)
+    """
+
+    def __init__(self, threshold: float = GATE_THRESHOLD, max_skip_seconds: float = GATE_MAX_SKIP_SECONDS,
+                 use_motion: bool = GATE_USE_MOTION):
+        self.threshold = threshold
+        self.max_skip_seconds = max_skip_seconds
+        self.use_motion = use_motion
+        self._reference = None      # 마지막으로 추론한 프레임의 signature
+        self._reference_time = 0.0
+        self.processed = 0
+        self.skipped = 0
+        self.last_diff = None
+
+    def should_process(self, frame, is_moving=None):
+        """
+        추론할 프레임이면 signature, 생략하면 None 반환
+        - 기준 프레임은 추론이 성공한 뒤 accept()로 갱신 (실패한 프레임 때문에 같은 장면을 건너뛰지 않도록)
+        """
+        now = time.monotonic()
+        current = signature(frame)
+        process = (
+            self._reference is None
+            or now - self._reference_time >= self.max_skip_seconds
+            or (self.use_motion and is_moving == 1)
+        )
+        if not process:
+            self.last_diff = float(np.mean(np.abs(current - self._reference)))
+            process = self.last_diff >= self.threshold
+
+        if not process:
+            self.skipped += 1
+            return None
+        return current
+
+    def accept(self, sig):
+        # 추론/저장이 끝난 프레임을 새 기준 프레임으로
+        self._reference = sig
+        self._reference_time = time.monotonic()
+        self.processed += 1
+
+    def stats(self):
+        total = self.processed + self.skipped
+        return {
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+            "last_diff": round(self.last_diff, 2) if self.last_diff is not None else None,
+        }
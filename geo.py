@@ -0,0 +1,157 @@
+# geo.py
+import numpy as np
+
+# WGS-84 타원체
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+# 하버사인용 평균 지구 반지름 (m)
+EARTH_RADIUS = 6371008.8
+
+VINCENTY_MAX_ITER = 200
+VINCENTY_TOL = 1e-12
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    구면 근사 거리 (m), 배열 입력 지원
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def vincenty(lat1, lon1, lat2, lon2):
+    """
+    WGS-84 타원체 거리 (m, Vincenty 역해법), 배열 입력 지원
+    - geopy.geodesic(Karney)과 mm 단위까지 일치
+    - 대척점 근처처럼 수렴하지 않는 쌍은 하버사인으로 대체
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    )
+    f = WGS84_F
+    L = lon2 - lon1
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(VINCENTY_MAX_ITER):
+            sinLam, cosLam = np.sin(lam), np.cos(lam)
+            sinSigma = np.sqrt((cosU2 * sinLam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cosLam) ** 2)
+            cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+            sigma = np.arctan2(sinSigma, cosSigma)
+            sinAlpha = np.where(sinSigma == 0, 0.0, cosU1 * cosU2 * sinLam / sinSigma)
+            cos2Alpha = 1 - sinAlpha ** 2
+            # 적도 위 두 점이면 cos2Alpha = 0
+            cos2SigmaM = np.where(cos2Alpha == 0, 0.0, cosSigma - 2 * sinU1 * sinU2 / cos2Alpha)
+            C = f / 16 * cos2Alpha * (4 + f * (4 - 3 * cos2Alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sinAlpha * (
+                sigma + C * sinSigma * (cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM ** 2))
+            )
+            converged = np.abs(lam - lam_prev) < VINCENTY_TOL
+            if converged.all():
+                break
+
+        u2 = cos2Alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        deltaSigma = B * sinSigma * (
+            cos2SigmaM + B / 4 * (
+                cosSigma * (-1 + 2 * cos2SigmaM ** 2)
+                - B / 6 * cos2SigmaM * (-3 + 4 * sinSigma ** 2) * (-3 + 4 * cos2SigmaM ** 2)
+            )
+        )
+        s = WGS84_B * A * (sigma - deltaSigma)
+
+    s = np.where(sinSigma == 0, 0.0, s)  # 같은 점
+    fallback = ~converged | ~np.isfinite(s)
+    if fallback.any():
+        s = np.where(fallback, haversine(np.degrees(lat1), np.degrees(lon1), np.degrees(lat2), np.degrees(lon2)), s)
+    return s
+
+
+METHODS = {
+    "haversine": haversine,
+    "vincenty": vincenty,
+}
+
+
+def distance(p1, p2, method: str = "vincenty") -> float:
+    """
+    두 점 (lat, lon) 사이 거리 (m)
+    """
+    return float(METHODS[method](p1[0], p1[1], p2[0], p2[1]))
+
+
+def segment_distances(latitudes, longitudes, method: str = "vincenty"):
+    """
+    연속한 점 사이 거리 배열 (길이 n-1)
+    """
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    if len(lat) < 2:
+        return np.zeros(0)
+    return METHODS[method](lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def path_length(latitudes, longitudes, method: str = "vincenty") -> float:
+    """
+    경로 전체 길이 (m)
+    """
+    return float(segment_distances(latitudes, longitudes, method).sum())
+
+
+def simplify(latitudes, longitudes, tolerance_m: float):
+    """
+    Douglas–Peucker 경로 단순화, 남길 점의 bool 마스크 반환
+    - 구간 평균 위도 기준 등장방형 투영(m) 위에서 계산
+    """
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    n = len(lat)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    x = np.radians(lon) * EARTH_RADIUS * np.cos(np.radians(lat.mean()))
+    y = np.radians(lat) * EARTH_RADIUS
+
+    # 재귀 대신 스택으로 구간 처리
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        seg_len = np.hypot(dx, dy)
+        if seg_len == 0:
+            dist = np.hypot(px, py)
+        else:
+            dist = np.abs(dx * py - dy * px) / seg_len
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            mid = first + 1 + i
+            keep[mid] = True
+            stack.append((first, mid))
+            stack.append((mid, last))
+    return keep
+
+
+def zoom_tolerance(zoom: int, latitude: float, pixels: float = 1.0) -> float:
+    """
+    웹 지도 줌 레벨에서 화면 1픽셀에 해당하는 거리 (m)
+    """
+    return 156543.03392 * np.cos(np.radians(latitude)) / (2 ** zoom) * pixels
@@ -0,0 +1,163 @@
+# geofence.py
+import math
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import Geofence, GeofenceEvent
+
+# 격자 한 칸 크기 (도), 약 1.1km
+GRID_DEGREES = 0.01
+# 이보다 많은 칸을 덮는 큰 구역은 격자 대신 사용자별 목록으로 관리
+MAX_FENCE_CELLS = 10000
+
+FenceShape = namedtuple("FenceShape", ["fence_id", "user_id", "lat", "lon", "bbox"])
+
+
+def point_in_polygon(lat: float, lon: float, poly_lat, poly_lon) -> bool:
+    """
+    Ray casting 방식 다각형 내부 판정 (변 단위 벡터 연산)
+    """
+    lat_j = np.roll(poly_lat, 1)
+    lon_j = np.roll(poly_lon, 1)
+    crosses = (poly_lat > lat) != (lat_j > lat)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = (lon_j - poly_lon) * (lat - poly_lat) / (lat_j - poly_lat) + poly_lon
+    return bool(np.count_nonzero(crosses & (lon < x_at)) % 2)
+
+
+def _cell(lat: float, lon: float):
+    return math.floor(lat / GRID_DEGREES), math.floor(lon / GRID_DEGREES)
+
+
+class GeofenceIndex:
+    """
+    사용자별 지오펜스 격자 인덱스와 진입 상태
+    - 위치 하나당 해당 격자 칸의 후보 구역만 다각형 판정
+    - 진입 상태는 메모리에 유지, 첫 사용 시 DB(구역 + 마지막 이벤트)에서 로딩
+    """
+
+    def __init__(self):
+        self._fences = {}     # fence_id → FenceShape
+        self._grid = {}       # (user_id, cell_lat, cell_lon) → {fence_id}
+        self._large = {}      # user_id → {fence_id} (격자에 넣지 않은 큰 구역)
+        self._inside = {}     # user_id → {fence_id}
+        self._loaded = False
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        result = await db.execute(select(Geofence))
+        fences = result.scalars().all()
+
+        # 구역별 마지막 이벤트로 현재 진입 상태 복원
+        result = await db.execute(
+            select(GeofenceEvent.fence_id, GeofenceEvent.user_id, GeofenceEvent.event_type)
+            .distinct(GeofenceEvent.fence_id)
+            .order_by(GeofenceEvent.fence_id, GeofenceEvent.timestamp.desc(), GeofenceEvent.id.desc())
+        )
+        last_events = result.all()
+
+        if self._loaded:
+            return
+        for fence in fences:
+            self.add(fence.fence_id, fence.user_id, fence.polygon)
+        for fence_id, user_id, event_type in last_events:
+            if event_type == "enter" and fence_id in self._fences:
+                self._inside.setdefault(user_id, set()).add(fence_id)
+        self._loaded = True
+
+    def _cells(self, shape: FenceShape):
+        min_lat, min_lon, max_lat, max_lon = shape.bbox
+        c0 = _cell(min_lat, min_lon)
+        c1 = _cell(max_lat, max_lon)
+        if (c1[0] - c0[0] + 1) * (c1[1] - c0[1] + 1) > MAX_FENCE_CELLS:
+            return None
+        return [(i, j) for i in range(c0[0], c1[0] + 1) for j in range(c0[1], c1[1] + 1)]
+
+    def add(self, fence_id: int, user_id: str, polygon):
+        # 같은 사용자의 구역 수정(교체)이면 진입 상태 유지, 다음 위치에서 새 다각형으로 다시 판정
+        # 소유자가 바뀌면 이전 사용자의 진입 상태에서 제외 (이탈 이벤트가 생기지 않도록)
+        old = self._fences.get(fence_id)
+        self.remove(fence_id, keep_inside=old is not None and old.user_id == user_id)
+        points = np.asarray(polygon, dtype=np.float64)
+        shape = FenceShape(
+            fence_id, user_id, points[:, 0], points[:, 1],
+            (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()),
+        )
+        self._fences[fence_id] = shape
+        cells = self._cells(shape)
+        if cells is None:
+            self._large.setdefault(user_id, set()).add(fence_id)
+            return
+        for cell in cells:
+            self._grid.setdefault((user_id,) + cell, set()).add(fence_id)
+
+    def remove(self, fence_id: int, keep_inside: bool = False):
+        shape = self._fences.pop(fence_id, None)
+        if shape is None:
+            return
+        cells = self._cells(shape)
+        if cells is None:
+            self._large.get(shape.user_id, set()).discard(fence_id)
+        else:
+            for cell in cells:
+                key = (shape.user_id,) + cell
+                bucket = self._grid.get(key)
+                if bucket is not None:
+                    bucket.discard(fence_id)
+                    if not bucket:
+                        del self._grid[key]
+        if not keep_inside:
+            self._inside.get(shape.user_id, set()).discard(fence_id)
+
+    def candidates(self, user_id: str, lat: float, lon: float):
+        return self._grid.get((user_id,) + _cell(lat, lon), set()) | self._large.get(user_id, set())
+
+    def containing(self, user_id: str, lat: float, lon: float):
+        contained = set()
+        for fence_id in self.candidates(user_id, lat, lon):
+            shape = self._fences[fence_id]
+            min_lat, min_lon, max_lat, max_lon = shape.bbox
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon \
+                    and point_in_polygon(lat, lon, shape.lat, shape.lon):
+                contained.add(fence_id)
+        return contained
+
+    def inside(self, user_id: str):
+        return set(self._inside.get(user_id, set()))
+
+    async def evaluate(self, db: AsyncSession, user_id: str, lat: float, lon: float, timestamp: datetime,
+                       was_inside=None):
+        """
+        위치 하나를 판정해 (진입/이탈 GeofenceEvent 목록, 새 진입 상태) 반환 (세션 추가는 호출 측에서)
+        - 진입 상태는 바로 바꾸지 않음, 커밋 후 committed()로 반영 (커밋 실패 시 이벤트 유실 방지)
+        - was_inside: 같은 요청에서 이어서 판정할 때 직전 판정의 새 진입 상태
+        """
+        await self.ensure_loaded(db)
+        now_inside = self.containing(user_id, lat, lon)
+        if was_inside is None:
+            was_inside = self._inside.get(user_id, set())
+        if now_inside == was_inside:
+            return [], now_inside
+
+        events = [
+            GeofenceEvent(fence_id=fence_id, user_id=user_id, event_type=event_type,
+                          latitude=lat, longitude=lon, timestamp=timestamp)
+            for event_type, fence_ids in (("enter", now_inside - was_inside), ("exit", was_inside - now_inside))
+            for fence_id in sorted(fence_ids)
+        ]
+        return events, now_inside
+
+    def committed(self, user_id: str, inside):
+        # 커밋 후 진입 상태 반영 (그 사이 삭제되었거나 다른 사용자로 옮겨진 구역은 제외)
+        if inside is not None:
+            self._inside[user_id] = {
+                fence_id for fence_id in inside
+                if fence_id in self._fences and self._fences[fence_id].user_id == user_id
+            }
+
+
+# 프로세스 공용 인스턴스
+geofences = GeofenceIndex()
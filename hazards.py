@@ -0,0 +1,131 @@
+# hazards.py
+import math
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import ObstacleData, CrackData
+from positions import last_positions
+import geo
+
+# 격자 한 칸 크기 (도), 약 110m
+GRID_DEGREES = 0.001
+# 인덱스에 유지하는 위험 요소 기간
+HAZARD_MAX_AGE = timedelta(days=30)
+PRUNE_INTERVAL = timedelta(hours=1)
+METERS_PER_DEGREE = 111320.0
+
+Hazard = namedtuple("Hazard", ["kind", "hazard_id", "user_id", "walker_id", "label", "latitude", "longitude", "detection_time"])
+
+
+def _cell(lat: float, lon: float):
+    return math.floor(lat / GRID_DEGREES), math.floor(lon / GRID_DEGREES)
+
+
+async def locate(db: AsyncSession, user_id: str, detection_time: datetime):
+    """
+    감지 시각에 가장 가까운 최근 GPS 위치 (캐시 사용, 없으면 (None, None))
+    """
+    fix = await last_positions.nearest(db, user_id, detection_time)
+    if fix is None:
+        return None, None
+    return fix.latitude, fix.longitude
+
+
+class HazardIndex:
+    """
+    장애물/포트홀 감지 위치 격자 인덱스
+    - 첫 조회 시 최근 HAZARD_MAX_AGE 기간의 감지 데이터로 채우고, 이후 저장 시 추가
+    """
+
+    def __init__(self):
+        self._grid = {}   # (cell_lat, cell_lon) → [Hazard]
+        self._ids = set()  # (kind, hazard_id) — 로드 전 add된 감지가 DB 로드로 중복되지 않도록
+        self._loaded = False
+        self._last_prune = datetime.utcnow()
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self._loaded:
+            return
+        since = datetime.utcnow() - HAZARD_MAX_AGE
+        loaded = []
+        for kind, table, id_col, label_col in (
+            ("obstacle", ObstacleData, ObstacleData.obstacle_id, ObstacleData.obstacle_type),
+            ("pothole", CrackData, CrackData.crack_id, CrackData.crack_type),
+        ):
+            result = await db.execute(
+                select(id_col, table.user_id, table.walker_id, label_col,
+                       table.latitude, table.longitude, table.detection_time)
+                .where(table.is_detected == 1)
+                .where(table.latitude.isnot(None))
+                .where(table.detection_time >= since)
+            )
+            loaded += [Hazard(kind, *row) for row in result.all()]
+
+        if self._loaded:
+            return
+        for hazard in loaded:
+            self._insert(hazard)
+        self._loaded = True
+
+    def _insert(self, hazard: Hazard):
+        key = (hazard.kind, hazard.hazard_id)
+        if key in self._ids:
+            return
+        self._ids.add(key)
+        self._grid.setdefault(_cell(hazard.latitude, hazard.longitude), []).append(hazard)
+
+    def add(self, kind: str, hazard_id: str, user_id: str, walker_id: str, label: str,
+            latitude, longitude, detection_time: datetime):
+        # 위치를 모르는 감지는 인덱스에 넣지 않음
+        if latitude is None or longitude is None:
+            return
+        self._insert(Hazard(kind, hazard_id, user_id, walker_id, label, latitude, longitude, detection_time))
+
+    def prune(self, now: datetime = None):
+        cutoff = (now or datetime.utcnow()) - HAZARD_MAX_AGE
+        for cell in list(self._grid):
+            kept = [h for h in self._grid[cell] if h.detection_time >= cutoff]
+            for h in self._grid[cell]:
+                if h.detection_time < cutoff:
+                    self._ids.discard((h.kind, h.hazard_id))
+            if kept:
+                self._grid[cell] = kept
+            else:
+                del self._grid[cell]
+
+    async def near(self, db: AsyncSession, lat: float, lon: float, radius_m: float, kind: str = None):
+        """
+        반경 안의 위험 요소를 가까운 순으로 반환 (격자 후보만 거리 계산)
+        """
+        await self.ensure_loaded(db)
+        now = datetime.utcnow()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self.prune(now)
+            self._last_prune = now
+
+        dlat = radius_m / METERS_PER_DEGREE
+        dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        c0 = _cell(lat - dlat, lon - dlon)
+        c1 = _cell(lat + dlat, lon + dlon)
+        cutoff = now - HAZARD_MAX_AGE
+
+        candidates = [
+            h
+            for i in range(c0[0], c1[0] + 1)
+            for j in range(c0[1], c1[1] + 1)
+            for h in self._grid.get((i, j), ())
+            if h.detection_time >= cutoff and (kind is None or h.kind == kind)
+        ]
+        if not candidates:
+            return []
+
+        points = np.array([(h.latitude, h.longitude) for h in candidates], dtype=np.float64)
+        distances = geo.haversine(lat, lon, points[:, 0], points[:, 1])
+        order = np.argsort(distances)
+        return [(candidates[i], float(distances[i])) for i in order if distances[i] <= radius_m]
+
+
+# 프로세스 공용 인스턴스
+hazard_index = HazardIndex()
@@ -0,0 +1,82 @@
+# heartrate_monitor.py
+import math
+from datetime import datetime, timedelta
+from cache import LRUCache
+from utils import detect_abnormal_heartrate
+
+EWMA_ALPHA = 0.05                       # 개인 기준선 갱신 비율
+WARMUP_SAMPLES = 30                     # 기준선이 안정될 때까지는 고정 범위(60~100)만 사용
+Z_THRESHOLD = 3.0                       # 범위 안이라도 개인 기준선에서 이만큼 벗어나면 이상
+Z_RANGE_THRESHOLD = 2.0                 # 범위를 벗어난 경우 개인 기준선 기준 최소 편차
+ALERT_COOLDOWN = timedelta(minutes=5)   # 같은 사용자 반복 알림 간격
+CACHE_SIZE = 10000
+
+
+class Baseline:
+    __slots__ = ("mean", "var", "count", "last_alert")
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+        self.last_alert = None
+
+    def zscore(self, value: float):
+        if self.count < WARMUP_SAMPLES or self.var <= 0:
+            return None
+        return (value - self.mean) / math.sqrt(self.var)
+
+    def update(self, value: float):
+        # 워밍업 동안은 누적 평균, 이후 EWMA 평균/분산
+        self.count += 1
+        alpha = max(EWMA_ALPHA, 1.0 / self.count)
+        diff = value - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1 - alpha) * (self.var + diff * incr)
+
+
+class HeartRateMonitor:
+    """
+    사용자별 심박수 이상 감지 (샘플당 O(1))
+    - 고정 범위(utils.detect_abnormal_heartrate)와 개인 기준선(EWMA z-score)을 함께 사용
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self._baselines = LRUCache(maxsize)
+
+    def observe(self, user_id: str, heartrate: int, timestamp: datetime):
+        """
+        샘플 하나 반영, 이상이면 알림 이벤트(dict) 반환
+        """
+        baseline = self._baselines.get(user_id)
+        if baseline is None:
+            baseline = Baseline()
+            self._baselines.put(user_id, baseline)
+
+        status = detect_abnormal_heartrate(heartrate)
+        z = baseline.zscore(heartrate)
+        if z is None:
+            anomaly = status != "normal"
+        else:
+            anomaly = abs(z) >= Z_THRESHOLD or (status != "normal" and abs(z) >= Z_RANGE_THRESHOLD)
+
+        event = None
+        if anomaly and (baseline.last_alert is None or timestamp - baseline.last_alert >= ALERT_COOLDOWN):
+            baseline.last_alert = timestamp
+            event = {
+                "type": "heartrate_anomaly",
+                "user_id": user_id,
+                "heartrate": heartrate,
+                "status": status if status != "normal" else ("high" if z > 0 else "low"),
+                "zscore": round(z, 2) if z is not None else None,
+                "baseline": round(baseline.mean, 1) if baseline.count else None,
+                "timestamp": timestamp.isoformat(),
+            }
+
+        baseline.update(heartrate)
+        return event
+
+
+# 프로세스 공용 인스턴스
+heartrate_monitor = HeartRateMonitor()
@@ -0,0 +1,185 @@
+# inference.py
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# 마이크로 배치: 이 개수가 모이거나 첫 프레임 이후 이 시간이 지나면 한 번에 추론
+BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 8))
+MAX_LATENCY_SECONDS = float(os.getenv("INFERENCE_MAX_LATENCY_MS", 30)) / 1000
+
+
+class LatestFrameChannel:
+    """
+    캡쳐 스레드 → 이벤트 루프 프레임 전달 (최신 프레임 하나만 유지)
+    - put_threadsafe는 캡쳐 스레드에서, get은 코루틴에서 호출 (루프를 막지 않음)
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._event = None
+        self._loop = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop = None):
+        # 감지 루프를 시작하는 이벤트 루프에 연결
+        self._loop = loop or asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._frame = None
+
+    def _put(self, frame):
+        # 이전 프레임은 버리고 최신 프레임으로 교체
+        self._frame = frame
+        self._event.set()
+
+    def put_threadsafe(self, frame):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._put, frame)
+
+    async def get(self, timeout: float):
+        """
+        다음 프레임 대기 (timeout 초 동안 없으면 asyncio.TimeoutError)
+        """
+        await asyncio.wait_for(self._event.wait(), timeout)
+        frame, self._frame = self._frame, None
+        self._event.clear()
+        return frame
+
+    def qsize(self):
+        return 0 if self._frame is None else 1
+
+
+class InferenceWorker:
+    """
+    모델 전용 스레드에서 추론 실행, await 가능한 API 제공
+    - 추론이 이벤트 루프를 막지 않아 다른 요청 처리가 지연되지 않음
+    - 모델 하나를 여러 스레드가 동시에 쓰지 않도록 모델당 스레드 1개
+    - 모델은 호출마다 get_model()로 받아 교체(hot-swap)된 모델이 다음 추론부터 적용됨
+    """
+
+    def __init__(self, get_model, name: str):
+        self.get_model = get_model   # async () → 현재 모델
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"infer-{name}")
+
+    async def run(self, fn, *args, **kwargs):
+        # 추론 스레드에서 임의 함수 실행 (전처리/후처리 포함)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def predict(self, frame, **kwargs):
+        # frame은 이미지 하나 또는 리스트 (리스트면 배치 추론)
+        model = await self.get_model()
+        return await self.run(model.predict, frame, **kwargs)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        logger.info(f"🛑 추론 워커 종료됨: {self.name}")
+
+
+class BatchScheduler:
+    """
+    여러 스트림/업로드 요청의 프레임을 모아 배치 추론 후 각 호출자에게 결과 전달
+    - max_batch개가 모이거나 가장 오래 기다린 프레임이 max_latency를 넘으면 바로 추론
+    - 추론은 InferenceWorker 스레드에서 실행, 추론 중 들어온 프레임은 다음 배치로
+    """
+
+    def __init__(self, worker: InferenceWorker, max_batch: int = BATCH_SIZE,
+                 max_latency: float = MAX_LATENCY_SECONDS, **predict_kwargs):
+        self.worker = worker
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency
+        self.predict_kwargs = predict_kwargs
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.frames = 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def predict(self, frame):
+        """
+        프레임 하나 추론, model.predict(frame)과 같은 형태(결과 리스트)로 반환
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put_nowait((loop.time(), frame, future))
+        return [await future]
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first[0] + self.max_latency
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 기다리다 취소된 요청은 제외
+        return [(frame, future) for _, frame, future in batch if not future.done()]
+
+    async def _dispatch(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            frames = [frame for frame, _ in batch]
+            try:
+                results = await self.worker.predict(frames, **self.predict_kwargs)
+            except Exception as e:
+                logger.error(f"❌ 배치 추론 실패 ({self.worker.name}, {len(frames)}장): {e}")
+                if len(batch) == 1:
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                    continue
+                # 잘못된 프레임 하나 때문에 다른 호출자까지 실패하지 않도록 한 장씩 재시도
+                await self._predict_each(batch)
+                continue
+
+            self.batches += 1
+            self.frames += len(frames)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _predict_each(self, batch):
+        for frame, future in batch:
+            if future.done():
+                continue
+            try:
+                results = await self.worker.predict(frame, **self.predict_kwargs)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            # 한 장씩 재시도한 추론도 크기 1 배치로 집계
+            self.batches += 1
+            self.frames += 1
+            if not future.done():
+                future.set_result(results[0])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0,
+            "max_batch": self.max_batch,
+            "max_latency_ms": round(self.max_latency * 1000),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
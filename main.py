@@ -6,7 +6,7 @@ from fastapi import FastAPI, Depends, HTTPException, File, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
+from sqlalchemy import update, delete, text
 from pydantic import BaseModel
 from model.models import Base, User, Guardian
 from utils import sqlalchemy_to_dict
@@ -14,20 +14,29 @@ from routers.activity import router as activity_router
 from routers.heartrate import router as heartrate_router
 from routers.gps import router as gps_router
 from routers.obstacle import router as obstacle_router
-from routers.pothole import router as pothole_router
+from routers.pothole import router as pothole_router, stream_manager as pothole_streams
 from routers.accelerometer import router as accelerometer_router
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from routers.obstacle import router as obstacle_router
+from routers.obstacle import router as obstacle_router, stream_manager as obstacle_streams
 from routers.profile import router as profile_router
 from routers.report import router as report_router
+from routers.geofence import router as geofence_router
+from routers.hazard import router as hazard_router
+from routers.models import router as models_router
+from rollups import accel_rollups, run_compactor, backfill_heartrate_daily, backfill_activity_daily
+from notifier import guardian_hub
+from dashboard import build_dashboard, create_dashboard_indexes
+from activity_segmenter import activity_segmenter, run_sweeper
+from model_registry import model_registry, MODEL_PRELOAD
 
 # from io import BytesIO
 # from PIL import Image
 # from ai import predict_image  # YOLO 함수 불러오기
 
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()  # .env에서 환경 변수 읽기
@@ -73,6 +82,22 @@ async def websocket_test(websocket: WebSocket):
     except WebSocketDisconnect:
         print("❌ 연결 끊김")
 
+# 보호자 알림 WebSocket (심박수 이상 등 사용자 이벤트 수신)
+@app.websocket("/ws/guardians/{guardian_id}")
+async def websocket_guardian(websocket: WebSocket, guardian_id: str):
+    await websocket.accept()
+    guardian_hub.connect(guardian_id, websocket)
+    print(f"🔌 보호자 WebSocket 연결됨: {guardian_id}")
+
+    try:
+        while True:
+            # 연결 유지용 (클라이언트 ping 등), 알림은 서버에서 전송
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        print(f"❌ 보호자 연결 끊김: {guardian_id}")
+    finally:
+        guardian_hub.disconnect(guardian_id, websocket)
+
 # 의존성: 데이터베이스 세션
 async def get_db() -> AsyncSession:
     async with async_session() as session:
@@ -97,11 +122,47 @@ class UserResponse(BaseModel):
     class Config:
         orm_mode = True
 
+# 기존 테이블에 나중에 추가된 컬럼 (테이블, 컬럼, 타입)
+ADDED_COLUMNS = [
+    ("obstacles", "latitude", "DOUBLE PRECISION"),
+    ("obstacles", "longitude", "DOUBLE PRECISION"),
+    ("crack", "latitude", "DOUBLE PRECISION"),
+    ("crack", "longitude", "DOUBLE PRECISION"),
+    ("activity", "source", "VARCHAR(10) DEFAULT 'manual'"),
+]
+
 # 애플리케이션 시작 시 데이터베이스 초기화
 @app.on_event("startup")
 async def on_startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # 기존 테이블에 추가된 컬럼 반영 (create_all은 컬럼을 추가하지 않음)
+        for table, column, column_type in ADDED_COLUMNS:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+        # 일별 집계 테이블 최초 채우기
+        await backfill_heartrate_daily(conn)
+        await backfill_activity_daily(conn)
+
+    # 가속도 집계 컴팩터, 자동 활동 정리 작업 시작
+    app.state.background_tasks = [
+        asyncio.create_task(run_compactor(accel_rollups)),
+        asyncio.create_task(run_sweeper(activity_segmenter)),
+        # 최신값 조회용 인덱스 (CONCURRENTLY, 수집 INSERT를 막지 않고 시작도 지연시키지 않음)
+        asyncio.create_task(create_dashboard_indexes(engine)),
+    ]
+
+    # 감지 모델은 기본적으로 첫 사용 시 로드 (MODEL_PRELOAD=1이면 백그라운드로 미리 로드)
+    if MODEL_PRELOAD:
+        model_registry.preload_all()
+
+# 종료 시 백그라운드 작업 정리 (남은 집계 반영, 카메라 스트림 중지)
+@app.on_event("shutdown")
+async def on_shutdown():
+    await obstacle_streams.stop_all()
+    await pothole_streams.stop_all()
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
 
 # 사용자 추가
 @app.post("/users/", response_model=UserResponse)
@@ -226,6 +287,19 @@ async def read_guardian(guardian_id: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Guardian not found")
     return guardian
 
+# 보호자 대시보드 (연결된 사용자들의 최신 센서 상태를 한 번에 조회)
+@app.get("/guardians/{guardian_id}/dashboard")
+async def read_guardian_dashboard(guardian_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Guardian.user_id).where(Guardian.guardian_id == guardian_id))
+    user_ids = [user_id for user_id in result.scalars().all() if user_id]
+    if not user_ids:
+        raise HTTPException(status_code=404, detail="Guardian not found")
+
+    return {
+        "guardian_id": guardian_id,
+        "users": await build_dashboard(db, user_ids),
+    }
+
 # 특정 사용자(user_id)에 연결된 보호자 조회
 @app.get("/users/{user_id}/guardians", response_model=list[GuardianResponse])
 async def read_guardians_by_user(user_id: str, db: AsyncSession = Depends(get_db)):
@@ -279,6 +353,9 @@ app.include_router(accelerometer_router, prefix="/api", tags=["accelerometer"])
 app.include_router(obstacle_router, prefix="/api", tags=["latest_obstacle"])
 app.include_router(profile_router, prefix="/api", tags=["profile"])
 app.include_router(report_router, prefix="/api", tags=["report"])
+app.include_router(geofence_router, prefix="/api", tags=["geofence"])
+app.include_router(hazard_router, prefix="/api", tags=["hazard"])
+app.include_router(models_router, prefix="/api", tags=["models"])
 #app.include_router(pothole_router, prefix="/api", tags=["upload"])
 
 # FastAPI 앱 실행
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, String, Integer, Float, TIMESTAMP
+from sqlalchemy import Column, DateTime, Date, String, Integer, Float, TIMESTAMP, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, String, Integer, TIMESTAMP, ForeignKey
 from sqlalchemy.sql import func
@@ -63,6 +63,8 @@ class ObstacleData(Base):
     walker_id = Column(String(100))
 
     is_detected = Column(Integer)  # ✅ 이 줄이 반드시 있어야 해!
+    latitude = Column(Float, nullable=True)   # 감지 시점 워커 위치 (최근 GPS)
+    longitude = Column(Float, nullable=True)
 
     from sqlalchemy import DateTime
 
@@ -76,6 +78,7 @@ class Activity(Base):
     start_time = Column(TIMESTAMP, nullable=False, default=func.now())
     end_time = Column(TIMESTAMP, nullable=True)
     duration = Column(Integer, default=0)  # 활동 시간 (분)
+    source = Column(String(10), default="manual")  # manual: /activity/start, auto: 움직임 자동 감지
 
 # Crack 감지 데이터 테이블
 class CrackData(Base):
@@ -87,6 +90,8 @@ class CrackData(Base):
     detection_time = Column(TIMESTAMP, default=func.now())  # ✅ 감지 시간
     walker_id = Column(String(100), ForeignKey("walkers.walker_id"))  # ✅ 워커 참조
     is_detected = Column(Integer)  # ✅ 1(감지됨), 0(감지 안됨)
+    latitude = Column(Float, nullable=True)   # 감지 시점 워커 위치 (최근 GPS)
+    longitude = Column(Float, nullable=True)
     
 # Accelerometer 데이터 테이블
 class AccelerometerData(Base):
@@ -99,3 +104,87 @@ class AccelerometerData(Base):
     accel_value = Column(Float, nullable=False)         # 가속도 값
     is_moving = Column(Integer, default=0)              # 1: 움직임 있음 / 0: 없음 (선택 사항)
     timestamp = Column(TIMESTAMP, default=func.now())   # 측정 시간
+
+# 가속도 1초 집계 테이블
+class AccelerometerRollup1s(Base):
+    __tablename__ = "accelerometer_rollup_1s"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    walker_id = Column(String(100), ForeignKey("walkers.walker_id"), primary_key=True)
+    bucket_start = Column(TIMESTAMP, primary_key=True)   # 구간 시작 시각 (UTC)
+
+    sample_count = Column(Integer, nullable=False, default=0)
+    accel_sum = Column(Float, nullable=False, default=0)  # 평균 = accel_sum / sample_count
+    accel_max = Column(Float, nullable=False)
+    moving_count = Column(Integer, nullable=False, default=0)  # 움직임 비율 = moving_count / sample_count
+
+# 가속도 1분 집계 테이블
+class AccelerometerRollup1m(Base):
+    __tablename__ = "accelerometer_rollup_1m"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    walker_id = Column(String(100), ForeignKey("walkers.walker_id"), primary_key=True)
+    bucket_start = Column(TIMESTAMP, primary_key=True)
+
+    sample_count = Column(Integer, nullable=False, default=0)
+    accel_sum = Column(Float, nullable=False, default=0)
+    accel_max = Column(Float, nullable=False)
+    moving_count = Column(Integer, nullable=False, default=0)
+
+# 지오펜스(안전 구역) 테이블
+class Geofence(Base):
+    __tablename__ = "geofences"
+
+    fence_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(100), ForeignKey("users.user_id"), nullable=False)
+    name = Column(String(100))
+    polygon = Column(JSON, nullable=False)                  # [[위도, 경도], ...]
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+# 지오펜스 진입/이탈 기록 테이블
+class GeofenceEvent(Base):
+    __tablename__ = "geofence_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    fence_id = Column(Integer, ForeignKey("geofences.fence_id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String(100), ForeignKey("users.user_id"), nullable=False)
+    event_type = Column(String(10), nullable=False)         # enter / exit
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    timestamp = Column(TIMESTAMP, nullable=False)
+
+# 일별 이동 거리 테이블 (KST 기준 날짜)
+class DailyDistance(Base):
+    __tablename__ = "daily_distance"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    distance_m = Column(Float, nullable=False, default=0)
+
+# 일별 심박수 집계 테이블 (KST 기준 날짜)
+class HeartRateDaily(Base):
+    __tablename__ = "heartrate_daily"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    bpm_sum = Column(Integer, nullable=False, default=0)   # 평균 = bpm_sum / sample_count
+    bpm_min = Column(Integer)
+    bpm_max = Column(Integer)
+
+# 일별 활동 시간 집계 테이블 (KST 기준 날짜, 활동 시작일 기준)
+class ActivityDaily(Base):
+    __tablename__ = "activity_daily"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    minutes = Column(Integer, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+
+# 일별 움직임 시간 집계 테이블 (KST 기준 날짜, 움직임이 있었던 1초 구간 수)
+class MotionDaily(Base):
+    __tablename__ = "motion_daily"
+
+    user_id = Column(String(100), ForeignKey("users.user_id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    moving_seconds = Column(Integer, nullable=False, default=0)
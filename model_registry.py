@@ -0,0 +1,149 @@
+# model_registry.py
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+from backends import load_model, IMGSZ
+
+logger = logging.getLogger(__name__)
+
+WARMUP_RUNS = 2   # 로드 직후 더미 프레임 추론 횟수 (첫 요청 지연 제거)
+# 1이면 시작 시 백그라운드로 미리 로드 (기본은 첫 사용 시 로드)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "0") == "1"
+# 로드 실패 후 이 시간 동안은 다시 로드하지 않고 바로 실패 반환 (warmup/swap 요청은 즉시 재시도)
+RETRY_COOLDOWN_SECONDS = float(os.getenv("MODEL_RETRY_COOLDOWN_SECONDS", 30))
+
+
+class ModelEntry:
+    __slots__ = ("name", "weights", "model", "version", "loaded_at", "warmup_ms", "loading", "error", "failed_at")
+
+    def __init__(self, name: str, weights: str):
+        self.name = name
+        self.weights = weights
+        self.model = None
+        self.version = 0
+        self.loaded_at = None
+        self.warmup_ms = None
+        self.loading = None   # 진행 중인 로드 작업 (asyncio.Task)
+        self.error = None
+        self.failed_at = None   # 마지막 로드 실패 시각 (time.monotonic)
+
+
+class ModelRegistry:
+    """
+    프로세스 공용 모델 저장소
+    - 등록만 해두고 첫 사용 시 로드 (임포트 시점에 모델을 올리지 않음)
+    - 로드와 워밍업은 전용 스레드에서 실행, 끝난 모델만 공개
+    - swap: 새 가중치를 로드/워밍업한 뒤 참조 한 번 교체 (진행 중인 추론은 기존 모델로 마무리)
+    """
+
+    def __init__(self):
+        self._entries = {}   # name → ModelEntry
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._swap_lock = asyncio.Lock()
+
+    def register(self, name: str, weights: str):
+        self._entries.setdefault(name, ModelEntry(name, weights))
+
+    def names(self):
+        return list(self._entries)
+
+    def _load_and_warm(self, weights: str):
+        # 로더 스레드에서 실행
+        model = load_model(weights)
+        frame = np.zeros((IMGSZ, IMGSZ, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(WARMUP_RUNS):
+            model.predict(frame, imgsz=IMGSZ, device="cpu", verbose=False)
+        return model, (time.perf_counter() - start) * 1000
+
+    async def _publish(self, entry: ModelEntry, weights: str):
+        loop = asyncio.get_running_loop()
+        try:
+            model, warmup_ms = await loop.run_in_executor(self._executor, self._load_and_warm, weights)
+        except Exception as e:
+            entry.error = str(e)
+            entry.failed_at = time.monotonic()
+            logger.error(f"❌ 모델 로드 실패 ({entry.name}: {weights}): {e}")
+            raise
+        finally:
+            entry.loading = None
+
+        entry.model = model
+        entry.weights = weights
+        entry.version += 1
+        entry.loaded_at = datetime.utcnow()
+        entry.warmup_ms = round(warmup_ms, 1)
+        entry.error = None
+        entry.failed_at = None
+        logger.info(f"✅ 모델 준비됨 ({entry.name} v{entry.version}: {weights}, 워밍업 {entry.warmup_ms}ms)")
+        return model
+
+    def _start_load(self, entry: ModelEntry, weights: str):
+        task = asyncio.create_task(self._publish(entry, weights))
+        # 아무도 기다리지 않아도 실패를 소비 (실패 내용은 entry.error에 기록됨)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def _cooling_down(self, entry: ModelEntry):
+        return entry.failed_at is not None and time.monotonic() - entry.failed_at < RETRY_COOLDOWN_SECONDS
+
+    def preload(self, name: str):
+        """
+        백그라운드 로드 시작 (이미 로드됐거나 로드 중이면 그대로), 로드 작업 반환
+        - 명시적 요청(warmup)이므로 실패 후 대기 시간과 관계없이 다시 로드
+        """
+        entry = self._entries[name]
+        if entry.model is None and entry.loading is None:
+            entry.loading = self._start_load(entry, entry.weights)
+        return entry.loading
+
+    def preload_all(self):
+        for name in self._entries:
+            self.preload(name)
+
+    async def get(self, name: str):
+        """
+        현재 모델 반환, 아직 없으면 로드 완료까지 대기 (동시 요청은 같은 로드를 공유)
+        - 로드가 실패한 뒤 대기 시간 동안은 다시 로드하지 않고 마지막 오류로 바로 실패
+          (추론 요청/프레임마다 전체 로드가 반복되지 않도록)
+        """
+        entry = self._entries[name]
+        if entry.model is not None:
+            return entry.model
+        if entry.loading is None and self._cooling_down(entry):
+            raise RuntimeError(f"model {name} unavailable: {entry.error}")
+        return await asyncio.shield(self.preload(name))
+
+    async def swap(self, name: str, weights: str):
+        """
+        새 가중치로 무중단 교체 (로드/워밍업이 끝날 때까지 기존 모델로 계속 서비스)
+        """
+        entry = self._entries[name]
+        async with self._swap_lock:
+            if entry.loading is not None:
+                await asyncio.gather(entry.loading, return_exceptions=True)
+            entry.loading = self._start_load(entry, weights)
+            task = entry.loading
+        await asyncio.shield(task)
+        return self.status(name)
+
+    def status(self, name: str):
+        entry = self._entries[name]
+        return {
+            "name": entry.name,
+            "weights": entry.weights,
+            "loaded": entry.model is not None,
+            "loading": entry.loading is not None,
+            "version": entry.version,
+            "loaded_at": entry.loaded_at.isoformat() if entry.loaded_at else None,
+            "warmup_ms": entry.warmup_ms,
+            "error": entry.error,
+        }
+
+
+# 프로세스 공용 인스턴스
+model_registry = ModelRegistry()
@@ -0,0 +1,196 @@
+# motion.py
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import AccelerometerData
+import numpy as np
+
+# 움직임 판정 규칙 (routers/accelerometer.py 기존 규칙과 동일)
+MOVING_THRESHOLD = 1.1   # 이 값 이상이면 움직임
+HOLD_SECONDS = 10        # 움직임 판정 유지 시간
+STOP_ZERO_COUNT = 5      # 최근 구간에 0이 이만큼 쌓이면 멈춤
+
+
+class MotionWindow:
+    """
+    (user_id, walker_id) 하나의 최근 10초 판정 기록
+    """
+    __slots__ = ("entries", "moving_count", "zero_count")
+
+    def __init__(self):
+        self.entries = deque()  # (timestamp, is_moving) - 시간순
+        self.moving_count = 0
+        self.zero_count = 0
+
+    def copy(self):
+        window = MotionWindow()
+        window.entries = deque(self.entries)
+        window.moving_count = self.moving_count
+        window.zero_count = self.zero_count
+        return window
+
+    def push(self, timestamp: datetime, is_moving: int):
+        self.entries.append((timestamp, is_moving))
+        if is_moving == 1:
+            self.moving_count += 1
+        else:
+            self.zero_count += 1
+
+    def prune(self, now: datetime):
+        # 10초보다 오래된 기록 제거
+        cutoff = now - timedelta(seconds=HOLD_SECONDS)
+        while self.entries and self.entries[0][0] < cutoff:
+            _, is_moving = self.entries.popleft()
+            if is_moving == 1:
+                self.moving_count -= 1
+            else:
+                self.zero_count -= 1
+
+    def decide(self, accel_value: float, now: datetime):
+        """
+        현재 샘플의 is_moving 판정 후 기록에 추가, (is_moving, zero_count) 반환
+        """
+        return self._decide(accel_value >= MOVING_THRESHOLD, now)
+
+    def decide_many(self, accel_values, timestamps, stored=()):
+        """
+        시간순 샘플 배열 일괄 판정, is_moving 리스트 반환
+        stored: 배치 구간에 이미 저장된 (timestamp, is_moving) 시간순 목록, 시각 순서대로 기록에 끼워 넣음
+        """
+        above = np.asarray(accel_values) >= MOVING_THRESHOLD  # 임계값 비교는 벡터화
+        stored = list(stored)
+        i = 0
+        decisions = []
+        for a, t in zip(above, timestamps):
+            while i < len(stored) and stored[i][0] <= t:
+                self.prune(stored[i][0])
+                self.push(*stored[i])
+                i += 1
+            decisions.append(self._decide(bool(a), t)[0])
+        return decisions
+
+    def _decide(self, above_threshold: bool, now: datetime):
+        self.prune(now)
+        zero_count = self.zero_count
+
+        # 1️⃣ 현재 accel_value가 1.1 이상이면 → 10초 동안 유지
+        if above_threshold:
+            is_moving = 1
+        else:
+            # 2️⃣ 최근 10초 이내에 is_moving = 1 이라도 하나라도 있으면 유지
+            is_moving = 1 if self.moving_count > 0 else 0
+            # 3️⃣ 단, 최근 5개 이상이 0이면 멈춘 것으로 판단
+            if zero_count >= STOP_ZERO_COUNT:
+                is_moving = 0
+
+        self.push(now, is_moving)
+        return is_moving, zero_count
+
+    @property
+    def last_is_moving(self):
+        return self.entries[-1][1] if self.entries else None
+
+    @property
+    def last_timestamp(self):
+        return self.entries[-1][0] if self.entries else None
+
+
+class MotionTracker:
+    """
+    워커별 움직임 상태를 프로세스 메모리에 유지
+    - 콜드 스타트(해당 워커 첫 요청)에만 DB에서 최근 10초를 읽어 초기화
+    - 이후 판정은 메모리만 사용 → 수신 경로는 INSERT만 수행
+    - 프로세스(워커)별 상태이므로 같은 워커의 데이터는 한 프로세스로 들어온다고 가정
+    """
+
+    def __init__(self):
+        self._windows = {}
+
+    async def _load_rows(self, db: AsyncSession, user_id: str, walker_id: str, since: datetime, until: datetime = None):
+        query = (
+            select(AccelerometerData.timestamp, AccelerometerData.is_moving)
+            .where(AccelerometerData.user_id == user_id)
+            .where(AccelerometerData.walker_id == walker_id)
+            .where(AccelerometerData.timestamp >= since)
+            .order_by(AccelerometerData.timestamp)
+        )
+        if until is not None:
+            query = query.where(AccelerometerData.timestamp <= until)
+        result = await db.execute(query)
+        return result.all()
+
+    async def _load_window(self, db: AsyncSession, user_id: str, walker_id: str, now: datetime):
+        window = MotionWindow()
+        for timestamp, is_moving in await self._load_rows(db, user_id, walker_id, now - timedelta(seconds=HOLD_SECONDS)):
+            window.push(timestamp, is_moving)
+        return window
+
+    async def get_window(self, db: AsyncSession, user_id: str, walker_id: str, now: datetime) -> MotionWindow:
+        key = (user_id, walker_id)
+        window = self._windows.get(key)
+        if window is None:
+            loaded = await self._load_window(db, user_id, walker_id, now)
+            # 로딩 중 다른 요청이 먼저 채웠으면 그 상태를 사용
+            window = self._windows.setdefault(key, loaded)
+        return window
+
+    async def decide(self, db: AsyncSession, user_id: str, walker_id: str, accel_value: float, now: datetime):
+        """
+        (is_moving, zero_count) 판정만 수행, 워커 상태는 커밋 후 committed()로 반영
+        """
+        window = await self.get_window(db, user_id, walker_id, now)
+        return window.copy().decide(accel_value, now)
+
+    async def decide_many(self, db: AsyncSession, user_id: str, walker_id: str, accel_values, timestamps):
+        """
+        시간순 배치 일괄 판정 (워커 상태는 커밋 후 committed()로 반영)
+        - 워커 상태보다 늦게 도착한 배치는 DB에서 그 구간 기록을 읽어 임시 기록으로 판정
+          (이후에 저장된 샘플이 과거 샘플 판정에 영향을 주지 않도록)
+        """
+        window = await self.get_window(db, user_id, walker_id, timestamps[0])
+        last = window.last_timestamp
+        if last is None or timestamps[0] >= last:
+            return window.copy().decide_many(accel_values, timestamps)
+
+        rows = await self._load_rows(
+            db, user_id, walker_id, timestamps[0] - timedelta(seconds=HOLD_SECONDS), timestamps[-1]
+        )
+        window = MotionWindow()
+        stored = []
+        for timestamp, is_moving in rows:
+            if timestamp < timestamps[0]:
+                window.push(timestamp, is_moving)
+            else:
+                stored.append((timestamp, is_moving))
+        return window.decide_many(accel_values, timestamps, stored)
+
+    def committed(self, user_id: str, walker_id: str, timestamps, flags):
+        """
+        커밋된 판정을 워커 상태에 반영 (상태의 마지막 기록보다 오래된 샘플은 건너뜀, 시간순 유지)
+        - 상태가 없으면 다음 요청에서 DB로 초기화되므로 그대로 둠
+        """
+        window = self._windows.get((user_id, walker_id))
+        if window is None:
+            return
+        for timestamp, is_moving in zip(timestamps, flags):
+            last = window.last_timestamp
+            if last is not None and timestamp < last:
+                continue
+            window.prune(timestamp)
+            window.push(timestamp, is_moving)
+
+    def peek(self, user_id: str, walker_id: str, now: datetime = None):
+        """
+        DB 조회 없이 마지막 is_moving 반환 (상태가 없거나 HOLD_SECONDS보다 오래된 판정이면 None)
+        """
+        window = self._windows.get((user_id, walker_id))
+        if window is None or window.last_timestamp is None:
+            return None
+        if (now or datetime.utcnow()) - window.last_timestamp > timedelta(seconds=HOLD_SECONDS):
+            return None   # 센서가 끊긴 워커의 예전 '이동 중' 판정은 쓰지 않음
+        return window.last_is_moving
+
+
+# 프로세스 공용 인스턴스
+motion_tracker = MotionTracker()
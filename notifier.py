@@ -0,0 +1,65 @@
+# notifier.py
+import asyncio
+import json
+import logging
+from fastapi import WebSocket
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import Guardian
+
+logger = logging.getLogger(__name__)
+
+SEND_TIMEOUT_SECONDS = 5
+
+
+class GuardianHub:
+    """
+    보호자 WebSocket 연결 관리 및 알림 전송
+    """
+
+    def __init__(self):
+        self._connections = {}   # guardian_id → {WebSocket}
+        self._tasks = set()      # 진행 중인 전송 작업 (GC 방지)
+
+    def connect(self, guardian_id: str, websocket: WebSocket):
+        self._connections.setdefault(guardian_id, set()).add(websocket)
+
+    def disconnect(self, guardian_id: str, websocket: WebSocket):
+        sockets = self._connections.get(guardian_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._connections[guardian_id]
+
+    async def _send(self, guardian_id: str, websocket: WebSocket, text: str):
+        try:
+            await asyncio.wait_for(websocket.send_text(text), SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"❌ 보호자 알림 전송 실패 ({guardian_id}): {e}")
+            self.disconnect(guardian_id, websocket)
+
+    async def send(self, guardian_ids, message: dict):
+        text = json.dumps(message, ensure_ascii=False)
+        await asyncio.gather(*(
+            self._send(guardian_id, websocket, text)
+            for guardian_id in guardian_ids
+            for websocket in list(self._connections.get(guardian_id, ()))
+        ))
+
+    async def notify_user_guardians(self, db: AsyncSession, user_id: str, message: dict):
+        """
+        사용자에 연결된 보호자에게 알림 전송 (접속한 보호자가 없으면 DB 조회도 생략)
+        전송은 백그라운드로 진행되어 요청을 지연시키지 않음
+        """
+        if not self._connections:
+            return
+        result = await db.execute(select(Guardian.guardian_id).where(Guardian.user_id == user_id))
+        guardian_ids = [g for g in result.scalars().all() if g in self._connections]
+        if guardian_ids:
+            task = asyncio.create_task(self.send(guardian_ids, message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+# 프로세스 공용 인스턴스
+guardian_hub = GuardianHub()
@@ -0,0 +1,100 @@
+# odometer.py
+from collections import namedtuple
+from datetime import datetime, date, timedelta
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import DailyDistance
+from cache import LRUCache
+import geo
+
+JITTER_RADIUS_M = 8.0                  # 기준점에서 이 거리 안의 이동은 정지 상태 GPS 잡음으로 간주
+MAX_SPEED_MPS = 4.0                    # 보행 보조기로 불가능한 속도의 점프는 제외
+RESET_GAP = timedelta(minutes=10)      # 이 시간 이상 끊긴 뒤의 점프는 거리 없이 기준점만 이동
+CACHE_SIZE = 10000
+
+Anchor = namedtuple("Anchor", ["latitude", "longitude", "timestamp"])
+
+
+class Odometer:
+    """
+    사용자별 KST 일 누적 이동 거리
+    - 마지막으로 인정된 위치(기준점)에서 JITTER_RADIUS_M 이상 벗어난 경우만 거리로 인정
+    - 인정된 거리는 daily_distance에 가산 upsert, 조회는 캐시 또는 PK 단건 조회
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self._anchors = LRUCache(maxsize)   # user_id → Anchor
+        self._totals = LRUCache(maxsize)    # (user_id, day) → 거리 (m)
+
+    def step(self, user_id: str, latitude: float, longitude: float, timestamp: datetime, prev_fix=None,
+             anchor=None):
+        """
+        위치 하나 반영, (인정된 이동 거리 (m), 새 기준점) 반환
+        - 기준점은 바로 바꾸지 않음, 커밋 후 committed()로 반영 (커밋 실패 시 거리 유실 방지)
+        prev_fix: 기준점이 없을 때(콜드 스타트) 사용할 직전 위치
+        anchor: 같은 요청에서 이어서 반영할 때 직전 step의 새 기준점
+        """
+        if anchor is None:
+            anchor = self._anchors.get(user_id)
+        if anchor is None and prev_fix is not None:
+            anchor = Anchor(prev_fix.latitude, prev_fix.longitude, prev_fix.timestamp)
+        current = Anchor(latitude, longitude, timestamp)
+        if anchor is None:
+            return 0.0, current
+        if timestamp <= anchor.timestamp:
+            return 0.0, anchor
+
+        moved = geo.distance((anchor.latitude, anchor.longitude), (latitude, longitude))
+        if moved < JITTER_RADIUS_M:
+            return 0.0, anchor
+
+        elapsed = (timestamp - anchor.timestamp).total_seconds()
+        if moved / elapsed > MAX_SPEED_MPS:
+            # 튀는 점은 버리되, 오래 끊겼다가 다른 곳에서 재개된 경우는 기준점만 옮김
+            if timestamp - anchor.timestamp >= RESET_GAP:
+                return 0.0, current
+            return 0.0, anchor
+
+        return moved, current
+
+    async def add(self, db: AsyncSession, user_id: str, increments: dict):
+        """
+        {KST 날짜: 거리} 가산 upsert (커밋은 호출 측에서)
+        """
+        for day, meters in increments.items():
+            if meters <= 0:
+                continue
+            stmt = pg_insert(DailyDistance).values(user_id=user_id, day=day, distance_m=meters)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DailyDistance.user_id, DailyDistance.day],
+                set_={"distance_m": DailyDistance.distance_m + stmt.excluded.distance_m},
+            )
+            await db.execute(stmt)
+
+    def committed(self, user_id: str, increments: dict, anchor=None):
+        # 커밋 후 기준점 (더 최신 기준점이 있으면 유지) / 캐시된 합계에 반영 (캐시에 없으면 다음 조회 때 DB에서 읽음)
+        if anchor is not None:
+            latest = self._anchors.get(user_id)
+            if latest is None or latest.timestamp <= anchor.timestamp:
+                self._anchors.put(user_id, anchor)
+        for day, meters in increments.items():
+            total = self._totals.get((user_id, day))
+            if total is not None:
+                self._totals.put((user_id, day), total + meters)
+
+    async def total(self, db: AsyncSession, user_id: str, day: date) -> float:
+        total = self._totals.get((user_id, day))
+        if total is None:
+            result = await db.execute(
+                select(DailyDistance.distance_m)
+                .where(DailyDistance.user_id == user_id)
+                .where(DailyDistance.day == day)
+            )
+            total = result.scalar() or 0.0
+            self._totals.put((user_id, day), total)
+        return total
+
+
+# 프로세스 공용 인스턴스
+odometer = Odometer()
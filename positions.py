@@ -0,0 +1,69 @@
+# positions.py
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.models import GPSData
+from cache import LRUCache
+
+# 사용자별로 보관하는 최근 위치 수
+KEEP_FIXES = 2
+CACHE_SIZE = 10000
+# 감지 데이터 위치 태깅 시 허용하는 GPS 시각 차이
+MAX_FIX_AGE = timedelta(minutes=10)
+
+Fix = namedtuple("Fix", ["latitude", "longitude", "timestamp"])
+
+
+class LastPositionCache:
+    """
+    사용자별 최근 GPS 위치 2개 캐시 (최신순)
+    - 저장 시 갱신, 캐시에 없을 때만 DB 조회
+    - 위치가 없는 사용자도 빈 리스트로 캐시해 반복 조회 방지
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self._cache = LRUCache(maxsize)
+
+    async def get(self, db: AsyncSession, user_id: str):
+        fixes = self._cache.get(user_id)
+        if fixes is None:
+            result = await db.execute(
+                select(GPSData.latitude, GPSData.longitude, GPSData.timestamp)
+                .where(GPSData.user_id == user_id)
+                .order_by(GPSData.timestamp.desc())
+                .limit(KEEP_FIXES)
+            )
+            loaded = [Fix(*row) for row in result.all()]
+            # 조회 중 저장된 위치가 있으면 합쳐서 보관
+            fixes = self._cache.get(user_id)
+            fixes = self._merge(loaded, fixes or [])
+            self._cache.put(user_id, fixes)
+        return fixes
+
+    async def nearest(self, db: AsyncSession, user_id: str, when: datetime, max_age: timedelta = MAX_FIX_AGE):
+        """
+        when 시각에 가장 가까운 최근 위치 (max_age 이상 차이 나면 None)
+        """
+        fixes = await self.get(db, user_id)
+        if not fixes:
+            return None
+        fix = min(fixes, key=lambda f: abs(f.timestamp - when))
+        return fix if abs(fix.timestamp - when) <= max_age else None
+
+    def record(self, user_id: str, latitude: float, longitude: float, timestamp: datetime):
+        fixes = self._cache.get(user_id)
+        if fixes is None:
+            # 캐시에 없으면 이전 위치를 알 수 없으므로 다음 get에서 DB로 채움
+            return
+        self._cache.put(user_id, self._merge(fixes, [Fix(latitude, longitude, timestamp)]))
+
+    @staticmethod
+    def _merge(a, b):
+        # 타임스탬프 최신순으로 KEEP_FIXES개만 유지
+        merged = sorted(set(a) | set(b), key=lambda f: f.timestamp, reverse=True)
+        return merged[:KEEP_FIXES]
+
+
+# 프로세스 공용 인스턴스
+last_positions = LastPositionCache()
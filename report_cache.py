@@ -0,0 +1,74 @@
+# report_cache.py
+from collections import OrderedDict
+from cache import TTLCache
+
+REPORT_CACHE_SIZE = 2000
+REPORT_CACHE_TTL = 300   # 초
+INVALIDATION_HISTORY = 10000   # 무효화 시각을 기억할 최근 사용자 수
+
+
+class ReportCache:
+    """
+    리포트 결과 캐시 (키: (user_id, 리포트, 기간))
+    - 해당 사용자 데이터가 저장되면 그 사용자 항목만 무효화
+    - 캐시 값에 계산 시작 시점의 세대 번호를 함께 저장, 사용자의 마지막 무효화보다 오래된 값은 버림
+    - 무효화 기록은 최근 사용자만 유지, 밀려난 사용자는 밀려난 기록 중 가장 최신 세대로 간주 (보수적으로 미스)
+    """
+
+    def __init__(self, maxsize: int = REPORT_CACHE_SIZE, ttl: float = REPORT_CACHE_TTL,
+                 history: int = INVALIDATION_HISTORY):
+        self._cache = TTLCache(maxsize, ttl)
+        self._clock = 0                     # 전체 무효화 횟수 (세대 번호)
+        self._invalidated = OrderedDict()   # user_id → 마지막 무효화 세대 (오래된 순)
+        self._floor = 0                     # 기록에서 밀려난 사용자의 무효화 세대 상한
+        self._history = history
+        self.invalidations = 0
+
+    def _invalidated_at(self, user_id: str) -> int:
+        return self._invalidated.get(user_id, self._floor)
+
+    def get(self, user_id: str, *key):
+        invalidated_at = self._invalidated_at(user_id)
+
+        def fresh(entry):
+            # 무효화 이전에 계산된 값은 버리고 미스로 집계
+            if entry[0] < invalidated_at:
+                self.invalidations += 1
+                return False
+            return True
+
+        entry = self._cache.get((user_id,) + key, valid=fresh)
+        return entry[1] if entry is not None else None
+
+    def generation(self, user_id: str) -> int:
+        return self._clock
+
+    def put(self, user_id: str, key: tuple, value, generation: int):
+        # 계산 도중 무효화된 결과는 저장하지 않음
+        if generation < self._invalidated_at(user_id):
+            return
+        self._cache.put((user_id,) + key, (generation, value))
+
+    def invalidate(self, user_id: str):
+        self._clock += 1
+        self._invalidated.pop(user_id, None)
+        self._invalidated[user_id] = self._clock
+        while len(self._invalidated) > self._history:
+            _, generation = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, generation)
+
+    def stats(self):
+        hits, misses = self._cache.hits, self._cache.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "invalidations": self.invalidations,
+            "size": len(self._cache),
+            "max_size": self._cache.maxsize,
+            "ttl_seconds": self._cache.ttl,
+        }
+
+
+# 프로세스 공용 인스턴스
+report_cache = ReportCache()
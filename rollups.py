@@ -0,0 +1,268 @@
+# rollups.py
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import async_session
+from model.models import (
+    AccelerometerRollup1s, AccelerometerRollup1m, HeartRateDaily, ActivityDaily, MotionDaily
+)
+from report_cache import report_cache
+from utils import kst_day
+
+logger = logging.getLogger(__name__)
+
+# 가속도 집계 테이블 (구간 길이 초, 모델)
+ACCEL_ROLLUPS = [
+    (1, AccelerometerRollup1s),
+    (60, AccelerometerRollup1m),
+]
+
+COMPACT_INTERVAL_SECONDS = 5   # 메모리 집계 → DB 반영 주기
+UPSERT_CHUNK = 1000
+
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    # 구간 시작 시각으로 내림
+    if seconds == 1:
+        return timestamp.replace(microsecond=0)
+    if seconds == 60:
+        return timestamp.replace(second=0, microsecond=0)
+    epoch = int((timestamp - datetime(1970, 1, 1)).total_seconds())
+    return datetime.utcfromtimestamp(epoch - epoch % seconds)
+
+
+class AccelRollupAccumulator:
+    """
+    수신 시점에 구간별 합계를 메모리에 누적하고, 컴팩터가 주기적으로 DB에 더해 넣음
+    - DB 반영은 ON CONFLICT 가산 방식이라 여러 번 나눠 반영해도 결과가 같음
+    """
+
+    def __init__(self):
+        # (구간 길이, user_id, walker_id, bucket_start) → [count, sum, max, moving]
+        self._buckets = {}
+
+    def add(self, user_id: str, walker_id: str, timestamp: datetime, accel_value: float, is_moving: int):
+        for seconds, _ in ACCEL_ROLLUPS:
+            key = (seconds, user_id, walker_id, bucket_start(timestamp, seconds))
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [1, accel_value, accel_value, is_moving]
+            else:
+                bucket[0] += 1
+                bucket[1] += accel_value
+                bucket[2] = max(bucket[2], accel_value)
+                bucket[3] += is_moving
+
+    def add_many(self, user_id: str, walker_id: str, timestamps, accel_values, is_moving):
+        for timestamp, value, moving in zip(timestamps, accel_values, is_moving):
+            self.add(user_id, walker_id, timestamp, float(value), int(moving))
+
+    def drain(self):
+        buckets, self._buckets = self._buckets, {}
+        return buckets
+
+    def restore(self, buckets):
+        # DB 반영 실패 시 다음 주기에 다시 반영되도록 되돌림
+        for key, (count, total, peak, moving) in buckets.items():
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [count, total, peak, moving]
+            else:
+                bucket[0] += count
+                bucket[1] += total
+                bucket[2] = max(bucket[2], peak)
+                bucket[3] += moving
+
+    async def _new_moving_seconds(self, session: AsyncSession, buckets):
+        """
+        이번 반영으로 처음 '움직임 있음'이 된 사용자별 1초 구간 수 → {(user_id, KST 날짜): 초}
+        - 같은 초에 여러 워커가 움직여도 사용자 기준 1초 (반영 후 모든 워커 행에서 이번 증가분을 빼 이전 상태 판단)
+        """
+        candidates = sorted({
+            (user_id, start)
+            for (s, user_id, _, start), bucket in buckets.items()
+            if s == 1 and bucket[3] > 0
+        })
+        table = AccelerometerRollup1s
+        seen_before = set()
+        for i in range(0, len(candidates), UPSERT_CHUNK):
+            result = await session.execute(
+                select(table.user_id, table.walker_id, table.bucket_start, table.moving_count)
+                .where(tuple_(table.user_id, table.bucket_start).in_(candidates[i:i + UPSERT_CHUNK]))
+            )
+            for user_id, walker_id, start, moving_count in result.all():
+                added = buckets.get((1, user_id, walker_id, start), (0, 0, 0, 0))[3]
+                if moving_count - added > 0:
+                    seen_before.add((user_id, start))
+
+        moving_seconds = {}   # (user_id, KST 날짜) → 초
+        for user_id, start in candidates:
+            if (user_id, start) not in seen_before:
+                key = (user_id, kst_day(start))
+                moving_seconds[key] = moving_seconds.get(key, 0) + 1
+        return moving_seconds
+
+    async def flush(self):
+        buckets = self.drain()
+        if not buckets:
+            return 0
+        moving_seconds = {}
+        try:
+            async with async_session() as session:
+                for seconds, table in ACCEL_ROLLUPS:
+                    rows = [
+                        {
+                            "user_id": user_id,
+                            "walker_id": walker_id,
+                            "bucket_start": start,
+                            "sample_count": count,
+                            "accel_sum": total,
+                            "accel_max": peak,
+                            "moving_count": moving,
+                        }
+                        for (s, user_id, walker_id, start), (count, total, peak, moving) in buckets.items()
+                        if s == seconds
+                    ]
+                    for i in range(0, len(rows), UPSERT_CHUNK):
+                        stmt = pg_insert(table).values(rows[i:i + UPSERT_CHUNK])
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=[table.user_id, table.walker_id, table.bucket_start],
+                            set_={
+                                "sample_count": table.sample_count + stmt.excluded.sample_count,
+                                "accel_sum": table.accel_sum + stmt.excluded.accel_sum,
+                                "accel_max": func.greatest(table.accel_max, stmt.excluded.accel_max),
+                                "moving_count": table.moving_count + stmt.excluded.moving_count,
+                            },
+                        )
+                        await session.execute(stmt)
+                moving_seconds = await self._new_moving_seconds(session, buckets)
+                await add_motion_daily(session, moving_seconds)
+                await session.commit()
+        except Exception as e:
+            self.restore(buckets)
+            logger.error(f"❌ 가속도 집계 반영 실패: {e}")
+            return 0
+        for user_id in {user_id for user_id, _ in moving_seconds}:
+            report_cache.invalidate(user_id)
+        return len(buckets)
+
+
+async def run_compactor(accumulator: AccelRollupAccumulator, interval: float = COMPACT_INTERVAL_SECONDS):
+    """
+    백그라운드 컴팩터: interval마다 메모리 집계를 DB에 반영
+    """
+    logger.info("🧮 가속도 집계 컴팩터 시작됨")
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await accumulator.flush()
+    except asyncio.CancelledError:
+        # 종료 시 남은 집계 반영
+        await accumulator.flush()
+        raise
+
+
+async def add_heartrate_daily(db: AsyncSession, user_id: str, samples):
+    """
+    (recorded_at, bpm) 샘플을 KST 날짜별로 묶어 heartrate_daily에 가산 upsert (커밋은 호출 측에서)
+    """
+    days = {}
+    for recorded_at, bpm in samples:
+        day = days.setdefault(kst_day(recorded_at), [0, 0, bpm, bpm])
+        day[0] += 1
+        day[1] += bpm
+        day[2] = min(day[2], bpm)
+        day[3] = max(day[3], bpm)
+    if not days:
+        return
+
+    stmt = pg_insert(HeartRateDaily).values([
+        {"user_id": user_id, "day": day, "sample_count": count, "bpm_sum": total, "bpm_min": low, "bpm_max": high}
+        for day, (count, total, low, high) in days.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HeartRateDaily.user_id, HeartRateDaily.day],
+        set_={
+            "sample_count": HeartRateDaily.sample_count + stmt.excluded.sample_count,
+            "bpm_sum": HeartRateDaily.bpm_sum + stmt.excluded.bpm_sum,
+            "bpm_min": func.least(HeartRateDaily.bpm_min, stmt.excluded.bpm_min),
+            "bpm_max": func.greatest(HeartRateDaily.bpm_max, stmt.excluded.bpm_max),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def backfill_heartrate_daily(conn):
+    """
+    집계 테이블이 비어 있으면 기존 심박수 기록에서 한 번 채움 (DB에서 GROUP BY)
+    """
+    existing = await conn.execute(select(HeartRateDaily.user_id).limit(1))
+    if existing.first() is not None:
+        return
+    await conn.execute(text("""
+        INSERT INTO heartrate_daily (user_id, day, sample_count, bpm_sum, bpm_min, bpm_max)
+        SELECT user_id, CAST(recorded_at + INTERVAL '9 hours' AS DATE),
+               COUNT(*), SUM(heartrate), MIN(heartrate), MAX(heartrate)
+        FROM heartrate
+        WHERE user_id IS NOT NULL AND recorded_at IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+    """))
+
+
+async def add_motion_daily(db: AsyncSession, moving_seconds: dict):
+    """
+    {(user_id, KST 날짜): 초} 움직임 시간 가산 upsert (커밋은 호출 측에서)
+    """
+    if not moving_seconds:
+        return
+    stmt = pg_insert(MotionDaily).values([
+        {"user_id": user_id, "day": day, "moving_seconds": seconds}
+        for (user_id, day), seconds in moving_seconds.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MotionDaily.user_id, MotionDaily.day],
+        set_={"moving_seconds": MotionDaily.moving_seconds + stmt.excluded.moving_seconds},
+    )
+    await db.execute(stmt)
+
+
+async def add_activity_daily(db: AsyncSession, user_id: str, start_time: datetime, minutes: int):
+    """
+    종료된 활동 하나를 시작일(KST) 기준으로 activity_daily에 가산 upsert (커밋은 호출 측에서)
+    """
+    stmt = pg_insert(ActivityDaily).values(
+        user_id=user_id, day=kst_day(start_time), minutes=minutes or 0, sessions=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ActivityDaily.user_id, ActivityDaily.day],
+        set_={
+            "minutes": ActivityDaily.minutes + stmt.excluded.minutes,
+            "sessions": ActivityDaily.sessions + stmt.excluded.sessions,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def backfill_activity_daily(conn):
+    """
+    집계 테이블이 비어 있으면 종료된 기존 활동에서 한 번 채움 (DB에서 GROUP BY)
+    """
+    existing = await conn.execute(select(ActivityDaily.user_id).limit(1))
+    if existing.first() is not None:
+        return
+    await conn.execute(text("""
+        INSERT INTO activity_daily (user_id, day, minutes, sessions)
+        SELECT user_id, CAST(start_time + INTERVAL '9 hours' AS DATE), COALESCE(SUM(duration), 0), COUNT(*)
+        FROM activity
+        WHERE end_time IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+    """))
+
+
+# 프로세스 공용 인스턴스
+accel_rollups = AccelRollupAccumulator()
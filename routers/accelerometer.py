@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from datetime import datetime, timedelta
+from sqlalchemy import select, desc, insert, func
+from datetime import datetime
+from typing import List
 from database import get_db
-from model.models import AccelerometerData
-from pydantic import BaseModel
+from model.models import AccelerometerData, AccelerometerRollup1s, AccelerometerRollup1m
+from pydantic import BaseModel, Field
+from motion import motion_tracker
+from accel_analysis import accel_buffers, analyze
+from rollups import accel_rollups
+from activity_segmenter import activity_segmenter
+import numpy as np
+import pytz
 import math
 
 router = APIRouter()
@@ -19,6 +26,23 @@ class AccelRequest(BaseModel):
     ay: float
     az: float
 
+class AccelSample(BaseModel):
+    timestamp: datetime
+    ax: float
+    ay: float
+    az: float
+
+class AccelBatchRequest(BaseModel):
+    user_id: str
+    walker_id: str
+    samples: List[AccelSample] = Field(..., min_length=1, max_length=5000)
+
+def to_utc_naive(timestamp: datetime) -> datetime:
+    # 타임존 정보가 있으면 UTC로 변환 (DB는 naive UTC 저장)
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone(pytz.utc).replace(tzinfo=None)
+    return timestamp
+
 # --------------------
 # POST: 센서 → 서버로 데이터 전송
 # --------------------
@@ -30,33 +54,13 @@ async def receive_from_hardware(
     now = datetime.utcnow()
     accel_value = math.sqrt(data.ax ** 2 + data.ay ** 2 + data.az ** 2)
 
-    # 최근 10초간 데이터 조회
-    ten_seconds_ago = now - timedelta(seconds=10)
-    result = await db.execute(
-        select(AccelerometerData)
-        .where(AccelerometerData.user_id == data.user_id)
-        .where(AccelerometerData.walker_id == data.walker_id)
-        .where(AccelerometerData.timestamp >= ten_seconds_ago)
-        .order_by(desc(AccelerometerData.timestamp))
+    # 메모리 상태로 is_moving 판정 (콜드 스타트 시에만 최근 10초 DB 조회)
+    is_moving, zero_count = await motion_tracker.decide(
+        db, data.user_id, data.walker_id, accel_value, now
     )
-    recent_entries = result.scalars().all()
-
-    # 기본값
-    is_moving = 0
-
-    # 1️⃣ 현재 accel_value가 1.1 이상이면 → 10초 동안 유지
-    if accel_value >= 1.1:
-        is_moving = 1
-    else:
-        # 2️⃣ 최근 10초 이내에 is_moving = 1 이라도 하나라도 있으면 유지
-        recent_has_moving = any(e.is_moving == 1 for e in recent_entries)
-        if recent_has_moving:
-            is_moving = 1
 
-        # 3️⃣ 단, 최근 5개 이상이 0이면 멈춘 것으로 판단
-        zero_count = sum(1 for e in recent_entries if e.is_moving == 0)
-        if zero_count >= 5:
-            is_moving = 0
+    # 원시 3축 샘플은 분석용 링버퍼에 보관
+    accel_buffers.append(data.user_id, data.walker_id, now, data.ax, data.ay, data.az)
 
     # 저장
     entry = AccelerometerData(
@@ -68,8 +72,11 @@ async def receive_from_hardware(
     )
     db.add(entry)
     await db.commit()
+    motion_tracker.committed(data.user_id, data.walker_id, [now], [is_moving])
+    accel_rollups.add(data.user_id, data.walker_id, now, accel_value, is_moving)
+    await activity_segmenter.observe(db, data.user_id, data.walker_id, now, is_moving)
 
-    print(f"DEBUG - accel_value: {accel_value:.3f}, is_moving: {is_moving}, zero_count: {zero_count if recent_entries else 0}")
+    print(f"DEBUG - accel_value: {accel_value:.3f}, is_moving: {is_moving}, zero_count: {zero_count}")
 
     return {
         "message": "✅ 센서 데이터 저장 완료",
@@ -78,6 +85,58 @@ async def receive_from_hardware(
         "timestamp": now.isoformat()
     }
 
+# --------------------
+# POST: 버퍼링된 샘플 일괄 전송
+# --------------------
+@router.post("/accelerometer/batch")
+async def receive_batch_from_hardware(
+    data: AccelBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    # UTC로 타임스탬프 변환 후 시간순 정렬
+    samples = sorted(data.samples, key=lambda s: to_utc_naive(s.timestamp))
+    timestamps = [to_utc_naive(s.timestamp) for s in samples]
+
+    # 가속도 크기 벡터 계산
+    axes = np.array([(s.ax, s.ay, s.az) for s in samples], dtype=np.float64)
+    accel_values = np.sqrt(np.einsum("ij,ij->i", axes, axes))
+
+    # 배치 전체에 is_moving 규칙 적용 (워커 상태는 커밋 후 배치 이후로 이어짐)
+    is_moving = await motion_tracker.decide_many(db, data.user_id, data.walker_id, accel_values, timestamps)
+
+    accel_buffers.extend(data.user_id, data.walker_id, timestamps, axes)
+
+    # 단일 INSERT로 일괄 저장
+    rows = [
+        {
+            "user_id": data.user_id,
+            "walker_id": data.walker_id,
+            "accel_value": float(value),
+            "is_moving": moving,
+            "timestamp": timestamp,
+        }
+        for value, moving, timestamp in zip(accel_values, is_moving, timestamps)
+    ]
+    try:
+        await db.execute(insert(AccelerometerData), rows)
+        await db.commit()
+        motion_tracker.committed(data.user_id, data.walker_id, timestamps, is_moving)
+        accel_rollups.add_many(data.user_id, data.walker_id, timestamps, accel_values, is_moving)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+    await activity_segmenter.observe_many(db, data.user_id, data.walker_id, timestamps, is_moving)
+
+    return {
+        "message": "✅ 센서 데이터 일괄 저장 완료",
+        "count": len(rows),
+        "moving_count": sum(is_moving),
+        "max_accel_value": round(float(accel_values.max()), 3),
+        "is_moving": is_moving[-1],
+        "from": timestamps[0].isoformat(),
+        "to": timestamps[-1].isoformat()
+    }
+
 # --------------------
 # GET: 최신 데이터 요청
 # --------------------
@@ -106,3 +165,95 @@ async def get_latest_data(
         "is_moving": latest.is_moving,
         "timestamp": latest.timestamp.isoformat()
     }
+
+# --------------------
+# GET: 최근 원시 데이터 분석 (케이던스 / 저크 / 낙상)
+# --------------------
+@router.get("/accelerometer/analysis")
+async def get_motion_analysis(
+    user_id: str = Query(...),
+    walker_id: str = Query(...),
+    seconds: float = Query(30, gt=0, le=60)
+):
+    buffer = accel_buffers.get(user_id, walker_id)
+    if buffer is None or len(buffer) < 2:
+        return {"message": "📭 데이터 없음"}
+
+    t, xyz = buffer.snapshot(seconds)
+    result = analyze(t, xyz)
+    if result is None:
+        return {"message": "📭 분석할 데이터 부족"}
+
+    return {
+        "user_id": user_id,
+        "walker_id": walker_id,
+        **result
+    }
+
+# --------------------
+# GET: 구간 집계 이력 (차트용)
+# --------------------
+@router.get("/accelerometer/history")
+async def get_accel_history(
+    user_id: str = Query(...),
+    walker_id: str = Query(...),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    max_points: int = Query(600, ge=10, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    # 1초 집계로 max_points 안에 들어오면 1초, 아니면 1분 집계 사용
+    # 1분 집계로도 넘치면 DB에서 여러 분을 한 구간으로 다시 묶음
+    span = (end - start).total_seconds()
+    if span <= max_points:
+        table, granularity, bucket_seconds = AccelerometerRollup1s, "1s", 1
+    else:
+        table, granularity = AccelerometerRollup1m, "1m"
+        minutes = math.ceil(span / 60 / max_points)
+        bucket_seconds = 60 * minutes
+
+    if bucket_seconds in (1, 60):
+        bucket = table.bucket_start
+    else:
+        epoch = func.extract("epoch", table.bucket_start)
+        bucket = func.to_timestamp(func.floor(epoch / bucket_seconds) * bucket_seconds)
+
+    result = await db.execute(
+        select(
+            bucket.label("bucket"),
+            func.sum(table.sample_count),
+            func.sum(table.accel_sum),
+            func.max(table.accel_max),
+            func.sum(table.moving_count),
+        )
+        .where(table.user_id == user_id)
+        .where(table.walker_id == walker_id)
+        .where(table.bucket_start >= start)
+        .where(table.bucket_start < end)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+    points = [
+        {
+            "timestamp": to_utc_naive(bucket_time).isoformat(),
+            "mean": round(total / count, 3),
+            "max": round(peak, 3),
+            "moving_ratio": round(moving / count, 3),
+            "samples": count,
+        }
+        for bucket_time, count, total, peak, moving in result.all()
+        if count
+    ]
+
+    return {
+        "user_id": user_id,
+        "walker_id": walker_id,
+        "granularity": granularity,
+        "bucket_seconds": bucket_seconds,
+        "points": points
+    }
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+from sqlalchemy import update
 from pydantic import BaseModel
 from model.models import Activity
 from database import get_db
+from report_cache import report_cache
+from rollups import add_activity_daily
+from activity_segmenter import activity_segmenter, OpenSession
 from datetime import datetime
 from datetime import datetime, timedelta, timezone
 router = APIRouter()
@@ -16,26 +19,32 @@ class ActivityAction(BaseModel):
 
 @router.post("/activity/start")
 async def start_activity(data: ActivityAction, db: AsyncSession = Depends(get_db)):
-    # 기존 미종료 활동이 있는지 확인
-    result = await db.execute(
-        select(Activity).where(
-            (Activity.user_id == data.user_id) &
-            (Activity.walker_id == data.walker_id) &
-            (Activity.end_time == None)
-        )
-    )
-    existing_activity = result.scalar()
-    if existing_activity:
+    # 기존 미종료 활동이 있는지 확인 (메모리 상태, 처음 보는 워커만 DB 조회)
+    current = await activity_segmenter.current(db, data.user_id, data.walker_id)
+    if current is not None and current.manual:
         raise HTTPException(status_code=400, detail="이미 시작된 활동이 있습니다.")
 
-    new_activity = Activity(
-        user_id=data.user_id,
-        walker_id=data.walker_id,
-        start_time=datetime.utcnow()
-    )
-    db.add(new_activity)
-    await db.commit()
-    await db.refresh(new_activity)
+    if current is not None:
+        # 움직임으로 자동 시작된 활동이 있으면 수동 활동으로 전환 (자동 종료 안 함)
+        await db.execute(update(Activity).where(Activity.id == current.activity_id).values(source="manual"))
+        await db.commit()
+        current.manual = True
+        new_activity = await db.get(Activity, current.activity_id)
+    else:
+        new_activity = Activity(
+            user_id=data.user_id,
+            walker_id=data.walker_id,
+            start_time=datetime.utcnow(),
+            source="manual"
+        )
+        db.add(new_activity)
+        await db.commit()
+        await db.refresh(new_activity)
+        activity_segmenter.track(
+            data.user_id, data.walker_id,
+            OpenSession(new_activity.id, new_activity.start_time, new_activity.start_time, manual=True)
+        )
+    report_cache.invalidate(data.user_id)
 
     # ✅ KST 변환 및 포맷
     KST = timezone(timedelta(hours=9))
@@ -46,32 +55,40 @@ async def start_activity(data: ActivityAction, db: AsyncSession = Depends(get_db
 # ✅ 활동 종료
 @router.post("/activity/stop")
 async def stop_activity(data: ActivityAction, db: AsyncSession = Depends(get_db)):
-    # 가장 최근 미완료 활동 찾기
-    result = await db.execute(
-        select(Activity).where(
-            (Activity.user_id == data.user_id) &
-            (Activity.walker_id == data.walker_id) &
-            (Activity.end_time == None)
-        ).order_by(Activity.start_time.desc())
-    )
-    activity = result.scalar()
-
-    if not activity:
+    # 열린 활동 찾기 (수동/자동 모두, 메모리 상태 사용)
+    current = await activity_segmenter.current(db, data.user_id, data.walker_id)
+    if current is None:
         raise HTTPException(status_code=404, detail="종료할 활동이 없습니다.")
 
     end_time = datetime.utcnow()
-    duration = int((end_time - activity.start_time).total_seconds() / 60)
+    duration = int((end_time - current.start_time).total_seconds() / 60)
 
-    activity.end_time = end_time
-    activity.duration = duration
+    # 아직 열린 경우에만 종료 (자동 종료가 먼저 끝냈으면 집계에 다시 더하지 않음)
+    result = await db.execute(
+        update(Activity)
+        .where(Activity.id == current.activity_id)
+        .where(Activity.end_time == None)
+        .values(end_time=end_time, duration=duration)
+    )
+    if not result.rowcount:
+        await db.rollback()
+        activity_segmenter.track(data.user_id, data.walker_id, None)
+        raise HTTPException(status_code=404, detail="종료할 활동이 없습니다.")
+    await add_activity_daily(db, data.user_id, current.start_time, duration)
 
-    await db.commit()
-    await db.refresh(activity)
+    try:
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+    current.manual = True   # 종료된 활동을 진행 중인 자동 판정이 다시 닫지 않도록
+    activity_segmenter.track(data.user_id, data.walker_id, None)
+    report_cache.invalidate(data.user_id)
 
     # ✅ KST 변환
     KST = timezone(timedelta(hours=9))
-    start_kst = activity.start_time.replace(tzinfo=timezone.utc).astimezone(KST)
-    end_kst = activity.end_time.replace(tzinfo=timezone.utc).astimezone(KST)
+    start_kst = current.start_time.replace(tzinfo=timezone.utc).astimezone(KST)
+    end_kst = end_time.replace(tzinfo=timezone.utc).astimezone(KST)
 
     # ✅ 원하는 형식으로 포맷
     start_formatted = start_kst.strftime('%Y-%m-%d %H:%M:%S')
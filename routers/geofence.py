@@ -0,0 +1,133 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from model.models import Geofence, GeofenceEvent
+from database import get_db
+from geofence import geofences
+
+router = APIRouter()
+
+# ✅ Pydantic 모델
+class GeofenceCreate(BaseModel):
+    user_id: str
+    name: Optional[str] = None
+    polygon: List[List[float]] = Field(..., min_length=3)   # [[위도, 경도], ...]
+
+def validate_polygon(polygon):
+    for point in polygon:
+        if len(point) != 2 or not (-90 <= point[0] <= 90) or not (-180 <= point[1] <= 180):
+            raise HTTPException(status_code=400, detail="polygon must be a list of [latitude, longitude]")
+
+def fence_to_dict(fence: Geofence):
+    return {
+        "fence_id": fence.fence_id,
+        "user_id": fence.user_id,
+        "name": fence.name,
+        "polygon": fence.polygon,
+        "created_at": fence.created_at,
+    }
+
+# ✅ 지오펜스 추가
+@router.post("/geofences")
+async def create_geofence(data: GeofenceCreate, db: AsyncSession = Depends(get_db)):
+    validate_polygon(data.polygon)
+    await geofences.ensure_loaded(db)
+
+    fence = Geofence(user_id=data.user_id, name=data.name, polygon=data.polygon)
+    db.add(fence)
+    try:
+        await db.commit()
+        await db.refresh(fence)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+
+    geofences.add(fence.fence_id, fence.user_id, fence.polygon)
+    return fence_to_dict(fence)
+
+# ✅ 사용자별 지오펜스 조회
+@router.get("/geofences")
+async def list_geofences(user_id: str = Query(...), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Geofence).where(Geofence.user_id == user_id).order_by(Geofence.fence_id))
+    fences = result.scalars().all()
+    await geofences.ensure_loaded(db)
+    inside = geofences.inside(user_id)
+    return [{**fence_to_dict(f), "inside": f.fence_id in inside} for f in fences]
+
+# ✅ 진입/이탈 기록 조회
+@router.get("/geofences/events")
+async def list_geofence_events(
+    user_id: str = Query(...),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(GeofenceEvent)
+        .where(GeofenceEvent.user_id == user_id)
+        .order_by(GeofenceEvent.timestamp.desc(), GeofenceEvent.id.desc())
+        .limit(limit)
+    )
+    return [
+        {
+            "fence_id": e.fence_id,
+            "event_type": e.event_type,
+            "latitude": e.latitude,
+            "longitude": e.longitude,
+            "timestamp": e.timestamp,
+        }
+        for e in result.scalars().all()
+    ]
+
+# ✅ 지오펜스 단건 조회
+@router.get("/geofences/{fence_id}")
+async def read_geofence(fence_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Geofence).where(Geofence.fence_id == fence_id))
+    fence = result.scalar()
+    if not fence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+    return fence_to_dict(fence)
+
+# ✅ 지오펜스 수정
+@router.put("/geofences/{fence_id}")
+async def update_geofence(fence_id: int, data: GeofenceCreate, db: AsyncSession = Depends(get_db)):
+    validate_polygon(data.polygon)
+    await geofences.ensure_loaded(db)
+
+    result = await db.execute(select(Geofence).where(Geofence.fence_id == fence_id))
+    fence = result.scalar()
+    if not fence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+
+    fence.user_id = data.user_id
+    fence.name = data.name
+    fence.polygon = data.polygon
+    try:
+        await db.commit()
+        await db.refresh(fence)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+
+    geofences.add(fence.fence_id, fence.user_id, fence.polygon)
+    return fence_to_dict(fence)
+
+# ✅ 지오펜스 삭제
+@router.delete("/geofences/{fence_id}")
+async def delete_geofence(fence_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(Geofence).where(Geofence.fence_id == fence_id))
+    fence = result.scalar()
+    if not fence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+
+    try:
+        await db.execute(delete(GeofenceEvent).where(GeofenceEvent.fence_id == fence_id))
+        await db.execute(delete(Geofence).where(Geofence.fence_id == fence_id))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+
+    geofences.remove(fence_id)
+    return {"message": f"Geofence {fence_id} deleted successfully"}
@@ -1,22 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from datetime import datetime
+from sqlalchemy import select, insert
+from datetime import datetime, date, timedelta, timezone
+from typing import List
 from pydantic import BaseModel, Field
-from geopy.distance import geodesic
+import numpy as np
+import json
 import pytz
 
 from model.models import GPSData
-from database import get_db
+from database import get_db, async_session
+from positions import last_positions
+from odometer import odometer
+from report_cache import report_cache
+from utils import KST, kst_day
+from geofence import geofences
+import geo
 
 router = APIRouter()
 
+# 경로 스트리밍 시 한 번에 읽어 단순화하는 점 개수 (메모리 상한)
+TRACK_CHUNK = 5000
+TRACK_MAX_CARRY = 4 * TRACK_CHUNK   # 단순화를 미룰 수 있는 최대 점 수
+
 # ✅ Pydantic 모델
 class GPSDataCreate(BaseModel):
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     timestamp: datetime
 
+class GPSTrackUpload(BaseModel):
+    fixes: List[GPSDataCreate] = Field(..., min_length=1, max_length=10000)
+
 # ✅ GPS 데이터 저장
 @router.post("/gps/{user_id}")
 async def create_gps_entry(user_id: str, data: GPSDataCreate, db: AsyncSession = Depends(get_db)):
@@ -27,15 +43,9 @@ async def create_gps_entry(user_id: str, data: GPSDataCreate, db: AsyncSession =
         if data.timestamp.tzinfo is not None:
             data.timestamp = data.timestamp.astimezone(pytz.utc).replace(tzinfo=None)
 
-        # 가장 최근 user_id의 GPS 데이터 조회
-        query = (
-            select(GPSData)
-            .where(GPSData.user_id == user_id)
-            .order_by(GPSData.timestamp.desc())
-            .limit(1)
-        )
-        result = await db.execute(query)
-        last_gps = result.scalars().first()
+        # 가장 최근 user_id의 GPS 데이터 (캐시, 없을 때만 DB 조회)
+        recent_fixes = await last_positions.get(db, user_id)
+        last_gps = recent_fixes[0] if recent_fixes else None
 
         # 거리 계산
         distance_moved = 0
@@ -44,7 +54,7 @@ async def create_gps_entry(user_id: str, data: GPSDataCreate, db: AsyncSession =
 
         if last_gps:
             prev_location = (last_gps.latitude, last_gps.longitude)
-            distance_moved = geodesic(prev_location, new_location).meters
+            distance_moved = geo.distance(prev_location, new_location)
             print(f"📍 From {prev_location} → To {new_location} | Distance: {distance_moved:.2f}m")
 
         # 새 데이터 저장
@@ -55,15 +65,146 @@ async def create_gps_entry(user_id: str, data: GPSDataCreate, db: AsyncSession =
             timestamp=data.timestamp
         )
         db.add(new_entry)
+
+        # 지오펜스 판정 / 일 이동 거리 누적 (순서가 뒤바뀐 과거 위치는 제외)
+        fence_events = []
+        inside = None
+        anchor = None
+        increments = {}
+        if last_gps is None or data.timestamp >= last_gps.timestamp:
+            fence_events, inside = await geofences.evaluate(db, user_id, data.latitude, data.longitude, data.timestamp)
+            db.add_all(fence_events)
+
+            moved, anchor = odometer.step(user_id, data.latitude, data.longitude, data.timestamp, last_gps)
+            if moved:
+                increments[kst_day(data.timestamp)] = moved
+                await odometer.add(db, user_id, increments)
+
         await db.commit()
-        await db.refresh(new_entry)
+        last_positions.record(user_id, data.latitude, data.longitude, data.timestamp)
+        geofences.committed(user_id, inside)
+        odometer.committed(user_id, increments, anchor)
+        if increments:
+            report_cache.invalidate(user_id)
 
         return {
             "message": "GPS data recorded successfully",
             "user_id": user_id,
             "prev_location": prev_location,
             "new_location": new_location,
-            "distance_moved": distance_moved
+            "distance_moved": distance_moved,
+            "geofence_events": [{"fence_id": e.fence_id, "event_type": e.event_type} for e in fence_events]
+        }
+
+    except Exception as e:
+        await db.rollback()
+        print(f"❌ Database Commit Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Database Commit Error: {str(e)}")
+
+# ✅ 오프라인 버퍼 경로 일괄 업로드
+@router.post("/gps/{user_id}/track")
+async def upload_gps_track(user_id: str, data: GPSTrackUpload, db: AsyncSession = Depends(get_db)):
+    try:
+        # UTC 변환 후 시간순 정렬, 같은 타임스탬프는 마지막 값만 사용
+        by_timestamp = {}
+        for fix in data.fixes:
+            timestamp = fix.timestamp
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(pytz.utc).replace(tzinfo=None)
+            by_timestamp[timestamp] = (fix.latitude, fix.longitude)
+        timestamps = sorted(by_timestamp)
+
+        # 이미 저장된 타임스탬프(재전송분) 제외 - 배치당 한 번만 조회
+        result = await db.execute(
+            select(GPSData.timestamp)
+            .where(GPSData.user_id == user_id)
+            .where(GPSData.timestamp >= timestamps[0])
+            .where(GPSData.timestamp <= timestamps[-1])
+        )
+        stored = set(result.scalars().all())
+        in_batch_duplicates = len(data.fixes) - len(timestamps)   # 배치 안에서 같은 타임스탬프
+        unique_count = len(timestamps)
+        timestamps = [t for t in timestamps if t not in stored]
+        already_stored = unique_count - len(timestamps)             # 이미 저장된 재전송분
+        # duplicates: 저장하지 않은 점 전체 (= in_batch_duplicates + already_stored)
+        duplicates = in_batch_duplicates + already_stored
+
+        if not timestamps:
+            return {
+                "message": "No new GPS data",
+                "user_id": user_id,
+                "received": len(data.fixes),
+                "inserted": 0,
+                "duplicates": duplicates,
+                "in_batch_duplicates": in_batch_duplicates,
+                "already_stored": already_stored,
+                "distance_moved": 0
+            }
+
+        points = np.array([by_timestamp[t] for t in timestamps], dtype=np.float64)
+
+        # 직전 위치가 배치보다 앞서면 경로 시작점으로 포함
+        recent_fixes = await last_positions.get(db, user_id)
+        last_gps = recent_fixes[0] if recent_fixes else None
+        if last_gps and last_gps.timestamp < timestamps[0]:
+            path = np.vstack([(last_gps.latitude, last_gps.longitude), points])
+        else:
+            path = points
+
+        # 구간 거리 한 번에 계산
+        distance_moved = geo.path_length(path[:, 0], path[:, 1])
+
+        # 단일 INSERT로 일괄 저장
+        rows = [
+            {"user_id": user_id, "latitude": lat, "longitude": lon, "timestamp": t}
+            for t, (lat, lon) in zip(timestamps, points.tolist())
+        ]
+        await db.execute(insert(GPSData), rows)
+
+        # 지오펜스 판정 / 일 이동 거리 누적은 직전 위치 이후의 점만 시간순으로
+        fence_events = []
+        inside = None
+        increments = {}
+        anchor = None
+        for row in rows:
+            if last_gps is None or row["timestamp"] >= last_gps.timestamp:
+                events, inside = await geofences.evaluate(
+                    db, user_id, row["latitude"], row["longitude"], row["timestamp"], inside
+                )
+                fence_events += events
+                moved, anchor = odometer.step(
+                    user_id, row["latitude"], row["longitude"], row["timestamp"], last_gps, anchor
+                )
+                if moved:
+                    day = kst_day(row["timestamp"])
+                    increments[day] = increments.get(day, 0.0) + moved
+        db.add_all(fence_events)
+        await odometer.add(db, user_id, increments)
+
+        await db.commit()
+        geofences.committed(user_id, inside)
+        odometer.committed(user_id, increments, anchor)
+        if increments:
+            report_cache.invalidate(user_id)
+        for row in rows[-2:]:
+            last_positions.record(user_id, row["latitude"], row["longitude"], row["timestamp"])
+
+        print(f"📥 GPS track from {user_id}: {len(rows)} fixes, {duplicates} duplicates, {distance_moved:.2f}m")
+
+        return {
+            "message": "GPS track recorded successfully",
+            "user_id": user_id,
+            "received": len(data.fixes),
+            "inserted": len(rows),
+            "duplicates": duplicates,
+            "in_batch_duplicates": in_batch_duplicates,
+            "already_stored": already_stored,
+            "from": timestamps[0],
+            "to": timestamps[-1],
+            "distance_moved": distance_moved,
+            "geofence_events": [
+                {"fence_id": e.fence_id, "event_type": e.event_type, "timestamp": e.timestamp} for e in fence_events
+            ]
         }
 
     except Exception as e:
@@ -73,15 +214,8 @@ async def create_gps_entry(user_id: str, data: GPSDataCreate, db: AsyncSession =
 
 @router.get("/gps/{user_id}")
 async def get_latest_gps_by_user(user_id: str, db: AsyncSession = Depends(get_db)):
-    # 최근 2개의 위치를 불러온다
-    query = (
-        select(GPSData)
-        .where(GPSData.user_id == user_id)
-        .order_by(GPSData.timestamp.desc())
-        .limit(2)
-    )
-    result = await db.execute(query)
-    records = result.scalars().all()
+    # 최근 2개의 위치를 불러온다 (캐시, 없을 때만 DB 조회)
+    records = await last_positions.get(db, user_id)
 
     if not records:
         raise HTTPException(status_code=404, detail="No GPS data found for this user")
@@ -93,10 +227,10 @@ async def get_latest_gps_by_user(user_id: str, db: AsyncSession = Depends(get_db
     if len(records) > 1:
         prev_location = (records[1].latitude, records[1].longitude)
         current_location = (latest.latitude, latest.longitude)
-        distance_moved = geodesic(prev_location, current_location).meters
+        distance_moved = geo.distance(prev_location, current_location)
 
     return {
-        "user_id": latest.user_id,
+        "user_id": user_id,
         "latitude": latest.latitude,
         "longitude": latest.longitude,
         "timestamp": latest.timestamp,
@@ -104,3 +238,158 @@ async def get_latest_gps_by_user(user_id: str, db: AsyncSession = Depends(get_db
         "prev_location": prev_location,
     }
 
+# ✅ 기간 내 이동 경로 총 거리
+@router.get("/gps/{user_id}/distance")
+async def get_distance_by_range(
+    user_id: str,
+    from_time: datetime = Query(..., alias="from"),
+    to_time: datetime = Query(..., alias="to"),
+    method: str = Query("vincenty", pattern="^(vincenty|haversine)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    # UTC로 타임스탬프 변환
+    if from_time.tzinfo is not None:
+        from_time = from_time.astimezone(pytz.utc).replace(tzinfo=None)
+    if to_time.tzinfo is not None:
+        to_time = to_time.astimezone(pytz.utc).replace(tzinfo=None)
+    if to_time <= from_time:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    result = await db.execute(
+        select(GPSData.latitude, GPSData.longitude)
+        .where(GPSData.user_id == user_id)
+        .where(GPSData.timestamp >= from_time)
+        .where(GPSData.timestamp <= to_time)
+        .order_by(GPSData.timestamp)
+    )
+    points = np.array(result.all(), dtype=np.float64).reshape(-1, 2)
+
+    # 한 번의 벡터 연산으로 전체 구간 거리 합산
+    distance_m = geo.path_length(points[:, 0], points[:, 1], method)
+
+    return {
+        "user_id": user_id,
+        "from": from_time,
+        "to": to_time,
+        "points": len(points),
+        "distance_m": distance_m,
+        "method": method,
+    }
+
+def _coords(points):
+    return ", ".join(f"[{lon}, {lat}]" for lat, lon in points.tolist())
+
+async def stream_track_geojson(user_id: str, start: datetime, end: datetime, zoom: int, day: date):
+    """
+    서버 측 커서로 구간별로 읽어 단순화하며 GeoJSON LineString 출력
+    - 구간 끝점을 강제로 남기지 않도록 마지막으로 남긴 점 이후의 꼬리는 다음 구간과 합쳐 단순화
+      (꼬리가 TRACK_MAX_CARRY를 넘으면 그 자리에서 끊음, 허용 오차는 어느 경우든 지켜짐)
+    - 전체 경로를 한 번에 단순화한 결과와 완전히 같지는 않음 (구간 내에서만 최댓점 탐색)
+    """
+    total = 0
+    kept = 0
+    yield '{"type": "Feature", "geometry": {"type": "LineString", "coordinates": ['
+
+    # 응답 스트리밍 동안 유지되는 별도 세션 사용
+    async with async_session() as session:
+        result = await session.stream(
+            select(GPSData.latitude, GPSData.longitude)
+            .where(GPSData.user_id == user_id)
+            .where(GPSData.timestamp >= start)
+            .where(GPSData.timestamp < end)
+            .order_by(GPSData.timestamp)
+            .execution_options(yield_per=TRACK_CHUNK)
+        )
+        carry = None   # 아직 단순화를 끝내지 않은 꼬리 (carry[0]은 이미 출력한 점)
+        async for rows in result.partitions(TRACK_CHUNK):
+            points = np.array(rows, dtype=np.float64)
+            total += len(points)
+            if carry is not None:
+                points = np.vstack([carry, points])
+            tolerance = geo.zoom_tolerance(zoom, float(points[:, 0].mean()))
+            mask = geo.simplify(points[:, 0], points[:, 1], tolerance)
+
+            # 마지막 점 직전까지 남긴 점 중 마지막 점까지만 확정, 나머지는 다음 구간으로
+            interior = np.flatnonzero(mask[:-1])
+            tail = int(interior[-1]) if len(interior) else 0
+            if len(points) - tail > TRACK_MAX_CARRY:
+                tail = len(points) - 1
+            mask[tail + 1:] = False
+            if carry is not None:
+                mask[0] = False  # 이미 출력한 점
+            selected = points[mask]
+            if len(selected):
+                yield (", " if kept else "") + _coords(selected)
+                kept += len(selected)
+            carry = points[tail:]
+
+        if carry is not None and len(carry) > 1:
+            tolerance = geo.zoom_tolerance(zoom, float(carry[:, 0].mean()))
+            mask = geo.simplify(carry[:, 0], carry[:, 1], tolerance)
+            mask[0] = False
+            selected = carry[mask]
+            yield (", " if kept else "") + _coords(selected)
+            kept += len(selected)
+
+    properties = {
+        "user_id": user_id,
+        "date": day.isoformat(),
+        "zoom": zoom,
+        "points": total,
+        "simplified_points": kept,
+    }
+    yield ']}, "properties": ' + json.dumps(properties) + "}"
+
+# ✅ 하루 이동 경로 (단순화된 GeoJSON)
+@router.get("/gps/{user_id}/track")
+async def get_gps_track(
+    user_id: str,
+    day: date = Query(None, alias="date"),
+    zoom: int = Query(16, ge=0, le=22),
+    db: AsyncSession = Depends(get_db)
+):
+    # KST 기준 하루 → UTC 구간
+    if day is None:
+        day = datetime.now(KST).date()
+    start = datetime(day.year, day.month, day.day, tzinfo=KST).astimezone(timezone.utc).replace(tzinfo=None)
+    end = start + timedelta(days=1)
+
+    # LineString은 점이 2개 이상이어야 하므로 스트리밍 전에 확인
+    result = await db.execute(
+        select(GPSData.id)
+        .where(GPSData.user_id == user_id)
+        .where(GPSData.timestamp >= start)
+        .where(GPSData.timestamp < end)
+        .limit(2)
+    )
+    if len(result.all()) < 2:
+        raise HTTPException(status_code=404, detail="Not enough GPS data for this date")
+
+    return StreamingResponse(
+        stream_track_geojson(user_id, start, end, zoom, day),
+        media_type="application/geo+json"
+    )
+
+# ✅ 일 누적 이동 거리 (KST 기준)
+@router.get("/gps/{user_id}/odometer")
+async def get_odometer(
+    user_id: str,
+    day: date = Query(None, alias="date"),
+    days: int = Query(1, ge=1, le=31),
+    db: AsyncSession = Depends(get_db)
+):
+    # date부터 거꾸로 days일 (기본: 오늘 하루)
+    if day is None:
+        day = datetime.now(KST).date()
+    daily = {}
+    for offset in range(days - 1, -1, -1):
+        d = day - timedelta(days=offset)
+        daily[d.isoformat()] = await odometer.total(db, user_id, d)
+
+    return {
+        "user_id": user_id,
+        "date": day.isoformat(),
+        "days": days,
+        "distance_m": sum(daily.values()),
+        "daily": daily,
+    }
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from hazards import hazard_index
+
+router = APIRouter()
+
+# ✅ 주변 위험 요소(장애물/포트홀) 조회
+@router.get("/hazards/near")
+async def get_hazards_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(100, gt=0, le=5000),
+    kind: str = Query(None, pattern="^(obstacle|pothole)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    hazards = await hazard_index.near(db, lat, lon, radius, kind)
+
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "radius": radius,
+        "count": len(hazards),
+        "hazards": [
+            {
+                "kind": h.kind,
+                "id": h.hazard_id,
+                "label": h.label,
+                "user_id": h.user_id,
+                "walker_id": h.walker_id,
+                "latitude": h.latitude,
+                "longitude": h.longitude,
+                "detection_time": h.detection_time.isoformat(),
+                "distance_m": round(distance, 1),
+            }
+            for h, distance in hazards[:limit]
+        ]
+    }
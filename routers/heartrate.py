@@ -1,37 +1,191 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from pydantic import BaseModel
+from sqlalchemy import tuple_, insert
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from typing import List, Optional
 from model.models import HeartRate  # 정확한 경로로 수정됨
-from database import get_db
+from database import get_db, async_session
+from heartrate_monitor import heartrate_monitor
+from rollups import add_heartrate_daily
+from report_cache import report_cache
+from notifier import guardian_hub
+import numpy as np
+import base64
+import json
 
 router = APIRouter()
 
+# 내보내기 시 한 번에 읽는 행 수
+EXPORT_CHUNK = 1000
+
 # Pydantic 모델
 class HeartRateCreate(BaseModel):
     user_id: str
     heartrate: int
 
+class HeartRateSample(BaseModel):
+    recorded_at: datetime
+    heartrate: int
+
+class HeartRateBatch(BaseModel):
+    user_id: str
+    samples: List[HeartRateSample] = Field(..., min_length=1, max_length=10000)
+
 # 심박수 기록 API
 @router.post("/heartrate/")
 async def create_heartrate(data: HeartRateCreate, db: AsyncSession = Depends(get_db)):
-    new_entry = HeartRate(user_id=data.user_id, heartrate=data.heartrate)
+    # 일별 집계와 같은 기준 시각을 쓰도록 기록 시간을 직접 지정
+    new_entry = HeartRate(user_id=data.user_id, heartrate=data.heartrate, recorded_at=datetime.utcnow())
     db.add(new_entry)
     try:
+        await add_heartrate_daily(db, data.user_id, [(new_entry.recorded_at, data.heartrate)])
         await db.commit()
         await db.refresh(new_entry)
-        return {"message": "Heart rate recorded successfully", "data": new_entry}
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail="Database Commit Error")
+    report_cache.invalidate(data.user_id)
+
+    # 이상 감지 (메모리 기준선, O(1)) → 보호자에게 알림
+    event = heartrate_monitor.observe(data.user_id, data.heartrate, new_entry.recorded_at)
+    if event:
+        await guardian_hub.notify_user_guardians(db, data.user_id, event)
+
+    return {"message": "Heart rate recorded successfully", "data": new_entry, "anomaly": event}
+
+# 심박수 일괄 기록 API
+@router.post("/heartrate/batch")
+async def create_heartrate_batch(data: HeartRateBatch, db: AsyncSession = Depends(get_db)):
+    samples = sorted(
+        ((to_utc_naive(s.recorded_at), s.heartrate) for s in data.samples),
+        key=lambda s: s[0]
+    )
+    rows = [{"user_id": data.user_id, "heartrate": bpm, "recorded_at": t} for t, bpm in samples]
+
+    # 단일 INSERT로 일괄 저장
+    try:
+        await db.execute(insert(HeartRate), rows)
+        await add_heartrate_daily(db, data.user_id, samples)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Database Commit Error")
+    report_cache.invalidate(data.user_id)
+
+    # 시간순으로 이상 감지
+    anomalies = [
+        event for event in (heartrate_monitor.observe(data.user_id, bpm, t) for t, bpm in samples)
+        if event
+    ]
+    for event in anomalies:
+        await guardian_hub.notify_user_guardians(db, data.user_id, event)
+
+    values = np.array([bpm for _, bpm in samples], dtype=np.float64)
+    return {
+        "message": "Heart rate batch recorded successfully",
+        "user_id": data.user_id,
+        "count": len(rows),
+        "from": samples[0][0].isoformat(),
+        "to": samples[-1][0].isoformat(),
+        "min": int(values.min()),
+        "max": int(values.max()),
+        "mean": round(float(values.mean()), 1),
+        "std": round(float(values.std()), 1),
+        "anomalies": anomalies
+    }
+
+# 페이지 커서: (recorded_at, id) → 문자열
+def encode_cursor(recorded_at: datetime, record_id: int) -> str:
+    raw = f"{recorded_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        recorded_at, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(recorded_at), int(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_utc_naive(timestamp: Optional[datetime]):
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def heartrate_query(user_id: str, start: Optional[datetime], end: Optional[datetime]):
+    query = select(HeartRate).where(HeartRate.user_id == user_id)
+    if start is not None:
+        query = query.where(HeartRate.recorded_at >= start)
+    if end is not None:
+        query = query.where(HeartRate.recorded_at < end)
+    return query.order_by(HeartRate.recorded_at.desc(), HeartRate.id.desc())
+
+def record_to_dict(record: HeartRate):
+    return {
+        "id": record.id,
+        "user_id": record.user_id,
+        "heartrate": record.heartrate,
+        "recorded_at": record.recorded_at.isoformat() if record.recorded_at else None,
+    }
 
 # 심박수 조회 API
+# - limit 또는 cursor가 있으면 (recorded_at, id) 키셋 페이지 단위로 반환
+# - 둘 다 없으면 기존처럼 전체 목록 반환 (start/end로 기간 제한 가능)
 @router.get("/heartrate/{user_id}")
-async def get_heartrate(user_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(HeartRate).where(HeartRate.user_id == user_id).order_by(HeartRate.recorded_at.desc())
+async def get_heartrate(
+    user_id: str,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    query = heartrate_query(user_id, to_utc_naive(start), to_utc_naive(end))
+
+    if limit is None and cursor is None:
+        result = await db.execute(query)
+        heartrate_records = result.scalars().all()
+        if not heartrate_records:
+            raise HTTPException(status_code=404, detail="No heart rate records found for this user")
+        return heartrate_records
+
+    limit = limit or 100
+    if cursor is not None:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(HeartRate.recorded_at, HeartRate.id) < tuple_(cursor_time, cursor_id))
+
+    # 다음 페이지 존재 여부 확인용으로 하나 더 조회
+    result = await db.execute(query.limit(limit + 1))
+    records = result.scalars().all()
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    return {
+        "user_id": user_id,
+        "items": [record_to_dict(r) for r in records],
+        "next_cursor": encode_cursor(records[-1].recorded_at, records[-1].id) if has_more else None
+    }
+
+async def stream_heartrate_ndjson(user_id: str, start: Optional[datetime], end: Optional[datetime]):
+    """서버 측 커서로 읽으며 한 줄씩 NDJSON 출력"""
+    # 응답 스트리밍 동안 유지되는 별도 세션 사용
+    async with async_session() as session:
+        result = await session.stream(
+            heartrate_query(user_id, start, end).execution_options(yield_per=EXPORT_CHUNK)
+        )
+        async for records in result.scalars().partitions(EXPORT_CHUNK):
+            yield "".join(json.dumps(record_to_dict(r)) + "\n" for r in records)
+
+# 심박수 내보내기 API (NDJSON 스트리밍)
+@router.get("/heartrate/{user_id}/export")
+async def export_heartrate(
+    user_id: str,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None)
+):
+    return StreamingResponse(
+        stream_heartrate_ndjson(user_id, to_utc_naive(start), to_utc_naive(end)),
+        media_type="application/x-ndjson"
     )
-    heartrate_records = result.scalars().all()
-    if not heartrate_records:
-        raise HTTPException(status_code=404, detail="No heart rate records found for this user")
-    return heartrate_records
@@ -0,0 +1,47 @@
+import os
+import re
+from fastapi import APIRouter, HTTPException, Query
+from model_registry import model_registry
+
+router = APIRouter()
+
+# 교체 가능한 가중치 파일 위치 (이 디렉토리 안의 .pt 파일 이름만 허용)
+WEIGHTS_DIR = os.path.realpath(os.getenv("MODEL_WEIGHTS_DIR", "."))
+WEIGHTS_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*\.pt")
+
+def resolve_weights(weights: str):
+    # 경로/확장자가 다르거나 디렉토리 밖을 가리키면 거부 (파일 존재 여부는 구분하지 않음)
+    invalid = HTTPException(status_code=400, detail="Invalid weights: expected a .pt file name in the weights directory")
+    if not WEIGHTS_NAME.fullmatch(weights):
+        raise invalid
+    path = os.path.realpath(os.path.join(WEIGHTS_DIR, weights))
+    if os.path.dirname(path) != WEIGHTS_DIR or not os.path.isfile(path):
+        raise invalid
+    return path
+
+def check_model(name: str):
+    if name not in model_registry.names():
+        raise HTTPException(status_code=404, detail="Model not found")
+
+# ✅ 등록된 모델 상태 조회
+@router.get("/models")
+async def list_models():
+    return [model_registry.status(name) for name in model_registry.names()]
+
+# ✅ 모델 미리 로드 (백그라운드 로드/워밍업 시작)
+@router.post("/models/{name}/warmup")
+async def warmup_model(name: str):
+    check_model(name)
+    model_registry.preload(name)
+    return model_registry.status(name)
+
+# ✅ 가중치 파일 무중단 교체 (로드/워밍업 완료 후 다음 추론부터 적용)
+@router.post("/models/{name}/swap")
+async def swap_model(name: str, weights: str = Query(...)):
+    check_model(name)
+    path = resolve_weights(weights)
+
+    try:
+        return await model_registry.swap(name, path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model swap failed: {str(e)}")
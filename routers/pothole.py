@@ -4,136 +4,111 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from database import get_db, async_session
 from model.models import CrackData
-from ultralytics import YOLO
+from hazards import hazard_index, locate
+from inference import InferenceWorker, BatchScheduler
+from streams import StreamManager, DetectionStream
+from model_registry import model_registry
+from functools import partial
 from datetime import datetime
 import uuid
 import numpy as np
 import cv2
 import asyncio
-import threading
-import queue
 
 app = FastAPI()
 router = APIRouter()
 
-# ✅ YOLO 모델 로드
-model = YOLO("lane_seg_best.pt")
-model.fuse()
+# ✅ YOLO 모델 등록
+# 백엔드는 INFERENCE_BACKEND(torch/onnx/openvino), INFERENCE_INT8로 선택 (실패 시 .pt)
+# 첫 사용 시 로드, /api/models/pothole/swap 으로 무중단 교체
+model_registry.register("pothole", "lane_seg_best.pt")
 
-# ✅ 스트리밍 URL
-STREAM_URL = "http://192.168.0.142:5000/?action=stream"
+# ✅ 추론 전용 스레드 (이벤트 루프를 막지 않음)
+inference_worker = InferenceWorker(partial(model_registry.get, "pothole"), "pothole")
+
+# ✅ 스트림/업로드 프레임을 모아 배치 추론 (INFERENCE_BATCH_SIZE, INFERENCE_MAX_LATENCY_MS)
+inference_scheduler = BatchScheduler(inference_worker, conf=0.3, imgsz=224, device="cpu", stream=False)
 
-# ✅ 프레임 큐
-frame_queue = queue.Queue(maxsize=1)
-
-# ✅ 프레임 캡쳐 스레드
-class FrameGrabber(threading.Thread):
-    def __init__(self, stream_url):
-        super().__init__()
-        self.stream_url = stream_url
-        self.cap = cv2.VideoCapture(self.stream_url)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        self.running = True
-
-    def run(self):
-        if not self.cap.isOpened():
-            print("❌ 카메라 열기 실패")
-            return
-
-        print("📸 FrameGrabber 시작됨")
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                continue
-            if frame_queue.full():
-                try:
-                    frame_queue.get_nowait()
-                except queue.Empty:
-                    pass
-            frame_queue.put(frame)
-
-    def stop(self):
-        self.running = False
-        self.cap.release()
-        print("🛑 FrameGrabber 종료됨")
+# ✅ 기본 스트리밍 URL (시작 요청에 stream_url이 없을 때)
+STREAM_URL = "http://192.168.0.142:5000/?action=stream"
 
 # ✅ DB 저장 함수
 async def save_to_db_safe(session, crack_id, user_id, crack_type, detection_time, walker_id, is_detected):
     try:
+        # 감지 시점 위치 (최근 GPS 캐시)
+        latitude, longitude = await locate(session, user_id, detection_time)
         crack = CrackData(
             crack_id=crack_id,
             user_id=user_id,
             crack_type=crack_type,
             detection_time=detection_time,
             walker_id=walker_id,
-            is_detected=is_detected
+            is_detected=is_detected,
+            latitude=latitude,
+            longitude=longitude
         )
         session.add(crack)
         await session.commit()
+        if is_detected:
+            hazard_index.add("pothole", crack_id, user_id, walker_id, crack_type,
+                             latitude, longitude, detection_time)
+        return True
     except Exception as e:
         await session.rollback()
         print(f"❌ DB 저장 실패: {e}")
+        return False
+
+# ✅ 프레임 하나 감지 - 스트림별 감지 루프에서 호출
+async def detect_frame(stream: DetectionStream, frame):
+    # YOLO 감지 (다른 스트림/업로드 프레임과 묶어 배치 추론)
+    detect_start = asyncio.get_event_loop().time()
+    results = await inference_scheduler.predict(frame)
+    detect_elapsed = asyncio.get_event_loop().time() - detect_start
+    print(f"🧠 YOLO 추론 시간 ({stream.walker_id}): {detect_elapsed:.3f}s")
+
+    labels_all = []
+    is_detected = 0
+
+    for result in results:
+        boxes = result.boxes
+        if boxes is not None:
+            confs = boxes.conf.cpu().numpy()
+            classes = boxes.cls.cpu().numpy()
+            for conf, cls in zip(confs, classes):
+                label = result.names[int(cls)]
+                labels_all.append(label)
+                if conf >= 0.5:
+                    is_detected = 1
+
+    label_str = str(labels_all) if labels_all else "[]"
+    print(f"🚨 감지 결과: is_detected={is_detected}, labels={label_str}")
+
+    detection_time = datetime.utcnow()
+    crack_id = f"crack_{uuid.uuid4()}"
+
+    db_start = asyncio.get_event_loop().time()
+    async with async_session() as session:
+        success = await save_to_db_safe(
+            session,
+            crack_id,
+            stream.user_id,
+            label_str,
+            detection_time,
+            stream.walker_id,
+            is_detected
+        )
+    db_elapsed = asyncio.get_event_loop().time() - db_start
 
-# ✅ 실시간 감지 루프
-async def detect_from_queue(user_id: str, walker_id: str, db_session_maker):
-    print("🧠 감지 루프 시작됨")
-
-    while True:
-        start_time = asyncio.get_event_loop().time()
-
-        try:
-            frame = frame_queue.get(timeout=5)
-        except queue.Empty:
-            print("⏳ 프레임 없음")
-            await asyncio.sleep(0.1)
-            continue
-
-        detect_start = asyncio.get_event_loop().time()
-        results = model.predict(frame, conf=0.3, imgsz=224, device="cpu", stream=False)
-        detect_elapsed = asyncio.get_event_loop().time() - detect_start
-        print(f"🧠 YOLO 추론 시간: {detect_elapsed:.3f}s")
-
-        labels_all = []
-        is_detected = 0
-
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                confs = boxes.conf.cpu().numpy()
-                classes = boxes.cls.cpu().numpy()
-                for conf, cls in zip(confs, classes):
-                    label = model.names[int(cls)]
-                    labels_all.append(label)
-                    if conf >= 0.5:
-                        is_detected = 1
-
-        label_str = str(labels_all) if labels_all else "[]"
-        print(f"🚨 감지 결과: is_detected={is_detected}, labels={label_str}")
-
-        detection_time = datetime.utcnow()
-        crack_id = f"crack_{uuid.uuid4()}"
-
-        db_start = asyncio.get_event_loop().time()
-        async with db_session_maker() as session:
-            await save_to_db_safe(
-                session,
-                crack_id,
-                user_id,
-                label_str,
-                detection_time,
-                walker_id,
-                is_detected
-            )
-        db_elapsed = asyncio.get_event_loop().time() - db_start
-
-        if is_detected:
-            print(f"✅ DB 저장 성공 (0.5 이상 감지!) - 저장 시간: {db_elapsed:.3f}s")
-        else:
-            print(f"✅ DB 저장 성공 (0.5 미만) - 저장 시간: {db_elapsed:.3f}s")
+    if not success:
+        # 감지 루프에서 실패로 처리 (변화 감지 기준 프레임을 갱신하지 않음)
+        raise RuntimeError("DB 저장 실패")
+    if is_detected:
+        print(f"✅ DB 저장 성공 (0.5 이상 감지!) - 저장 시간: {db_elapsed:.3f}s")
+    else:
+        print(f"✅ DB 저장 성공 (0.5 미만) - 저장 시간: {db_elapsed:.3f}s")
 
-        total_elapsed = asyncio.get_event_loop().time() - start_time
-        print(f"🔁 전체 루프 시간: {total_elapsed:.3f}s")
-        await asyncio.sleep(max(0, 1.0 - total_elapsed))
+# ✅ 워커별 스트림 관리 (스트림마다 캡쳐 스레드/프레임 채널, 추론 워커는 공유)
+stream_manager = StreamManager("pothole", detect_frame)
 
 # ✅ 이미지 업로드 감지 API
 @router.post("/pothole/upload")
@@ -146,9 +121,11 @@ async def upload_image(
     try:
         image_bytes = await file.read()
         np_arr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        frame = await asyncio.to_thread(cv2.imdecode, np_arr, cv2.IMREAD_COLOR)
+        if frame is None:
+            return JSONResponse(status_code=400, content={"error": "이미지를 읽을 수 없습니다."})
 
-        results = model.predict(frame, conf=0.3, imgsz=224, device="cpu", stream=False)
+        results = await inference_scheduler.predict(frame)
 
         labels_all = []
         is_detected = 0
@@ -159,7 +136,7 @@ async def upload_image(
                 confs = boxes.conf.cpu().numpy()
                 classes = boxes.cls.cpu().numpy()
                 for conf, cls in zip(confs, classes):
-                    label = model.names[int(cls)]
+                    label = result.names[int(cls)]
                     labels_all.append(label)
                     if conf >= 0.5:
                         is_detected = 1
@@ -185,19 +162,42 @@ async def upload_image(
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
-# ✅ 실시간 감지 시작 API
+# ✅ 실시간 감지 시작 API (워커별 스트림, 같은 워커면 기존 스트림만 교체)
 @router.post("/pothole/stream/start")
 async def start_detection(
     user_id: str = Query(...),
     walker_id: str = Query(...),
+    stream_url: str = Query(STREAM_URL),
     db: AsyncSession = Depends(get_db)
 ):
-    global frame_grabber
-    frame_grabber = FrameGrabber(STREAM_URL)
-    frame_grabber.start()
-
-    asyncio.create_task(detect_from_queue(user_id, walker_id, async_session))
-    return {"message": "스트리밍 감지를 시작했습니다."}
+    await stream_manager.start(walker_id, user_id, stream_url)
+    return {"message": "스트리밍 감지를 시작했습니다.", "walker_id": walker_id, "stream_url": stream_url}
+
+# ✅ 실시간 감지 중지 API (walker_id가 없으면 전체 중지)
+@router.post("/pothole/stream/stop")
+async def stop_detection(walker_id: str = Query(None)):
+    if walker_id is None:
+        return {"message": "모든 스트리밍 감지를 중지했습니다.", "stopped": await stream_manager.stop_all()}
+    stopped = await stream_manager.stop(walker_id)
+    if not stopped:
+        return {"message": "감지 스레드가 실행 중이 아닙니다.", "walker_id": walker_id}
+    return {"message": "스트리밍 감지를 중지했습니다.", "walker_id": walker_id, "stopped": stopped}
+
+# ✅ 실시간 감지 상태 API (walker_id가 없으면 전체 스트림)
+@router.get("/pothole/status")
+async def get_detection_status(walker_id: str = Query(None)):
+    if walker_id is None:
+        streams = stream_manager.status()
+        return {
+            "stream_count": len(streams),
+            "streams": streams,
+            "gate": stream_manager.gate_stats(),
+            "inference": inference_scheduler.stats()
+        }
+    stream = stream_manager.get(walker_id)
+    if stream is None:
+        return {"walker_id": walker_id, "frame_grabber_running": False, "detection_task_running": False}
+    return stream.status()
 
 # ✅ 최신 감지 결과 API
 @app.get("/pothole/latest")
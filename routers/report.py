@@ -1,38 +1,66 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from fastapi import HTTPException
+from sqlalchemy import select, func, cast, literal_column, Date
 from database import get_db
-from model.models import HeartRate, Activity
-from datetime import datetime, timedelta
+from model.models import Activity, HeartRateDaily, ActivityDaily, DailyDistance, MotionDaily
+from datetime import datetime, date, timedelta
+from typing import Optional
+from utils import KST
+from report_cache import report_cache
 
 router = APIRouter()
 
-# 주간 심박수 평균 조회 API
+def week_range(week_start: Optional[date]):
+    # 기본값: 이번 주 (KST 월요일 시작)
+    if week_start is None:
+        today = datetime.now(KST).date()
+        week_start = today - timedelta(days=today.weekday())
+    return week_start, week_start + timedelta(days=7)
+
+# 주간 심박수 평균 조회 API (일별 집계 테이블에서 해당 주만 조회)
 @router.get("/report/weekly-heartrate")
-async def get_weekly_heartrate(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_weekly_heartrate(
+    user_id: str,
+    week_start: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    start, end = week_range(week_start)
+    cached = report_cache.get(user_id, "weekly-heartrate", start)
+    if cached is not None:
+        return cached
+    generation = report_cache.generation(user_id)
+
     result = await db.execute(
-        select(HeartRate).where(HeartRate.user_id == user_id)
+        select(
+            HeartRateDaily.day,
+            (func.sum(HeartRateDaily.bpm_sum) / func.sum(HeartRateDaily.sample_count)).label("average")
+        )
+        .where(HeartRateDaily.user_id == user_id)
+        .where(HeartRateDaily.day >= start)
+        .where(HeartRateDaily.day < end)
+        .group_by(HeartRateDaily.day)
     )
-    records = result.scalars().all()
 
-    # 모든 요일 리스트 고정
+    # 모든 요일 리스트 고정, 없는 요일은 0 출력
     DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    summary = {day: [] for day in DAYS}
-
-    for record in records:
-        day_name = record.recorded_at.strftime("%a")  # 'Mon', 'Tue', ...
-        if day_name in summary:
-            summary[day_name].append(record.heartrate)
+    averaged = {day: 0 for day in DAYS}
+    for day, average in result.all():
+        averaged[DAYS[day.weekday()]] = int(average or 0)
 
-    # 없는 요일은 0 출력
-    averaged = {day: int(sum(values) / len(values)) if values else 0 for day, values in summary.items()}
-
-    return {"weekly_averages": averaged}
+    response = {"week_start": start.isoformat(), "weekly_averages": averaged}
+    report_cache.put(user_id, ("weekly-heartrate", start), response, generation)
+    return response
 
 
 # 주간 활동 시간 평균 조회 API
 @router.get("/report/weekly-activity")
 async def get_weekly_activity(user_id: str, db: AsyncSession = Depends(get_db)):
+    cached = report_cache.get(user_id, "weekly-activity")
+    if cached is not None:
+        return cached
+    generation = report_cache.generation(user_id)
+
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
     result = await db.execute(
         select(Activity).where(
@@ -51,4 +79,99 @@ async def get_weekly_activity(user_id: str, db: AsyncSession = Depends(get_db)):
     # 요일별 누적 시간 계산 (분 → 시간/분 포맷 변환)
     averaged = {day: f"{sum(values)//60}h {sum(values)%60}m" for day, values in summary.items()}
 
-    return {"weekly_averages": averaged}
+    response = {"weekly_averages": averaged}
+    report_cache.put(user_id, ("weekly-activity",), response, generation)
+    return response
+
+
+# 리포트 캐시 적중률 조회 API
+@router.get("/report/cache/stats")
+async def get_report_cache_stats():
+    return report_cache.stats()
+
+
+# 지표별 (일별 집계 테이블, 값 계산식, 단위)
+REPORT_METRICS = {
+    "heartrate": (
+        HeartRateDaily,
+        lambda: func.sum(HeartRateDaily.bpm_sum) * 1.0 / func.nullif(func.sum(HeartRateDaily.sample_count), 0),
+        "bpm",
+    ),
+    "activity": (ActivityDaily, lambda: func.sum(ActivityDaily.minutes), "min"),
+    "distance": (DailyDistance, lambda: func.sum(DailyDistance.distance_m), "m"),
+    "motion": (MotionDaily, lambda: func.sum(MotionDaily.moving_seconds) / 60.0, "min"),
+}
+MAX_REPORT_DAYS = 366 * 3
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def period_starts(start: date, end: date, granularity: str):
+    # 구간 안의 모든 기간 시작일 (데이터 없는 기간도 0으로 채우기 위함)
+    periods = []
+    current = period_start(start, granularity)
+    while current <= end:
+        periods.append(current)
+        if granularity == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == "week" else 1)
+    return periods
+
+# 기간별 리포트 API (일/주/월 단위, 일별 집계 테이블에서 계산)
+@router.get("/report")
+async def get_report(
+    user_id: str,
+    metric: str = Query(..., pattern="^(heartrate|activity|distance|motion)$"),
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    # 기본값: 최근 7일 (KST, end 포함)
+    end = end or datetime.now(KST).date()
+    start = start or end - timedelta(days=6)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"range must be within {MAX_REPORT_DAYS} days")
+
+    cached = report_cache.get(user_id, "report", metric, granularity, start, end)
+    if cached is not None:
+        return cached
+    generation = report_cache.generation(user_id)
+
+    table, value, unit = REPORT_METRICS[metric]
+    if granularity == "day":
+        bucket = table.day
+    else:
+        # GROUP BY와 SELECT가 같은 식이 되도록 단위는 바인드 파라미터가 아닌 리터럴로 (값은 pattern으로 검증됨)
+        bucket = cast(func.date_trunc(literal_column(f"'{granularity}'"), table.day), Date)
+
+    result = await db.execute(
+        select(bucket.label("period"), value().label("value"))
+        .where(table.user_id == user_id)
+        .where(table.day >= start)
+        .where(table.day <= end)
+        .group_by(bucket)
+    )
+    values = {period: value for period, value in result.all()}
+
+    response = {
+        "user_id": user_id,
+        "metric": metric,
+        "granularity": granularity,
+        "unit": unit,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": [
+            {"period": period.isoformat(), "value": round(float(values.get(period) or 0), 1)}
+            for period in period_starts(start, end, granularity)
+        ],
+    }
+    report_cache.put(user_id, ("report", metric, granularity, start, end), response, generation)
+    return response
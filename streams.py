@@ -0,0 +1,187 @@
+# streams.py
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+import cv2
+from inference import LatestFrameChannel
+from frame_gate import FrameGate
+from motion import motion_tracker
+
+logger = logging.getLogger(__name__)
+
+FRAME_TIMEOUT_SECONDS = 5   # 이 시간 동안 프레임이 없으면 경고 후 계속 대기
+DETECT_INTERVAL_SECONDS = 1.0   # 스트림별 감지 주기
+JOIN_TIMEOUT_SECONDS = 2
+
+
+# 프레임 캡쳐 스레드
+class FrameGrabber(threading.Thread):
+    def __init__(self, stream_url: str, channel: LatestFrameChannel):
+        super().__init__(daemon=True)
+        self.stream_url = stream_url
+        self.channel = channel
+        self.running = True
+        self.opened = False
+
+    def run(self):
+        # 카메라 연결도 이 스레드에서 (요청 처리를 막지 않음)
+        cap = cv2.VideoCapture(self.stream_url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            logger.error(f"❌ 카메라 열기 실패: {self.stream_url}")
+            return
+
+        self.opened = True
+        logger.info(f"📸 FrameGrabber 시작됨: {self.stream_url}")
+        try:
+            while self.running:
+                ret, frame = cap.read()
+                if not ret:
+                    time.sleep(0.05)
+                    continue
+                # 기존 프레임은 채널에서 교체됨
+                self.channel.put_threadsafe(frame)
+        finally:
+            cap.release()
+            logger.info(f"🛑 FrameGrabber 종료됨: {self.stream_url}")
+
+    def stop(self):
+        self.running = False
+
+
+class DetectionStream:
+    """
+    워커 하나의 카메라 스트림 (캡쳐 스레드 + 최신 프레임 채널 + 감지 태스크)
+    """
+
+    def __init__(self, walker_id: str, user_id: str, stream_url: str):
+        self.walker_id = walker_id
+        self.user_id = user_id
+        self.stream_url = stream_url
+        self.channel = LatestFrameChannel()
+        self.grabber = FrameGrabber(stream_url, self.channel)
+        self.task = None
+        self.gate = FrameGate()   # 장면 변화가 없으면 추론 생략
+        self.started_at = datetime.utcnow()
+        self.frames = 0        # 감지 처리한 프레임 수
+        self.errors = 0
+        self.last_detection_time = None
+
+    def status(self):
+        return {
+            "walker_id": self.walker_id,
+            "user_id": self.user_id,
+            "stream_url": self.stream_url,
+            "started_at": self.started_at.isoformat(),
+            "frame_grabber_running": self.grabber.is_alive(),
+            "camera_opened": self.grabber.opened,
+            "detection_task_running": self.task is not None and not self.task.done(),
+            "queue_size": self.channel.qsize(),
+            "frames": self.frames,
+            "errors": self.errors,
+            "gate": self.gate.stats(),
+            "last_detection_time": self.last_detection_time.isoformat() if self.last_detection_time else None,
+        }
+
+
+class StreamManager:
+    """
+    워커(walker_id)별 카메라 스트림 여러 개를 동시에 관리
+    - 스트림마다 캡쳐 스레드와 최신 프레임 채널을 따로 두고, 추론은 process 함수(공용 추론 워커)로 공유
+    - 같은 워커로 다시 시작하면 기존 스트림만 교체
+    """
+
+    def __init__(self, name: str, process, interval: float = DETECT_INTERVAL_SECONDS):
+        self.name = name
+        self._process = process   # async (DetectionStream, frame) → None
+        self.interval = interval
+        self._streams = {}        # walker_id → DetectionStream
+        self._retired_gate = [0, 0]   # 중지된 스트림의 (추론, 생략) 프레임 수 누적
+
+    async def _run(self, stream: DetectionStream):
+        logger.info(f"🧠 감지 루프 시작됨 ({self.name}: {stream.walker_id})")
+        loop = asyncio.get_running_loop()
+        while True:
+            start_time = loop.time()
+            try:
+                frame = await stream.channel.get(timeout=FRAME_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"⏳ 프레임 없음 ({self.name}: {stream.walker_id})")
+                continue
+
+            try:
+                # 변화 감지 (이동 중이 아니고 직전 추론 프레임과 거의 같으면 생략, 직전 결과 유지)
+                is_moving = motion_tracker.peek(stream.user_id, stream.walker_id)
+                sig = stream.gate.should_process(frame, is_moving)
+                if sig is not None:
+                    await self._process(stream, frame)
+                    stream.gate.accept(sig)
+                    stream.frames += 1
+                    stream.last_detection_time = datetime.utcnow()
+            except Exception as e:
+                stream.errors += 1
+                logger.error(f"❌ 감지 루프 오류 ({self.name}: {stream.walker_id}): {e}")
+
+            elapsed = loop.time() - start_time
+            await asyncio.sleep(max(0, self.interval - elapsed))
+
+    async def start(self, walker_id: str, user_id: str, stream_url: str):
+        # 같은 워커의 기존 스트림 정리 (동시에 시작 요청이 와도 하나만 남도록 반복 확인)
+        while walker_id in self._streams:
+            await self.stop(walker_id)
+
+        stream = DetectionStream(walker_id, user_id, stream_url)
+        stream.channel.bind()
+        stream.grabber.start()
+        stream.task = asyncio.create_task(self._run(stream))
+        self._streams[walker_id] = stream
+        logger.info(f"🚀 스트리밍 감지 시작 ({self.name}) - user_id: {user_id}, walker_id: {walker_id}")
+        return stream
+
+    async def stop(self, walker_id: str):
+        """
+        스트림 하나 중지, 중지된 컴포넌트 목록 반환 (없으면 빈 리스트)
+        """
+        stream = self._streams.pop(walker_id, None)
+        if stream is None:
+            return []
+
+        self._retired_gate[0] += stream.gate.processed
+        self._retired_gate[1] += stream.gate.skipped
+
+        stopped = []
+        if stream.grabber.is_alive():
+            stream.grabber.stop()
+            await asyncio.to_thread(stream.grabber.join, JOIN_TIMEOUT_SECONDS)
+            stopped.append("frame_grabber")
+        if stream.task is not None and not stream.task.done():
+            stream.task.cancel()
+            try:
+                await stream.task
+            except asyncio.CancelledError:
+                pass
+            stopped.append("detection_task")
+        logger.info(f"🛑 스트리밍 감지 중지 ({self.name}: {walker_id}): {stopped}")
+        return stopped
+
+    async def stop_all(self):
+        return {walker_id: await self.stop(walker_id) for walker_id in list(self._streams)}
+
+    def get(self, walker_id: str):
+        return self._streams.get(walker_id)
+
+    def status(self):
+        return [stream.status() for stream in self._streams.values()]
+
+    def gate_stats(self):
+        # 프로세스 시작 이후 전체 스트림(중지된 스트림 포함)의 추론/생략 프레임 수
+        processed = self._retired_gate[0] + sum(stream.gate.processed for stream in self._streams.values())
+        skipped = self._retired_gate[1] + sum(stream.gate.skipped for stream in self._streams.values())
+        total = processed + skipped
+        return {
+            "processed": processed,
+            "skipped": skipped,
+            "skip_ratio": round(skipped / total, 3) if total else 0.0,
+        }
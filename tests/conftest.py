@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 테스트는 실제 DB 없이 실행 (엔진 생성용 URL만 지정)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
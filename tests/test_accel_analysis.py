@@ -0,0 +1,21 @@
+import numpy as np
+from accel_analysis import RawAccelBuffer
+
+
+def test_out_of_order_batch_is_merged_in_time_order():
+    buffer = RawAccelBuffer(capacity=5)
+    buffer.extend([10.0, 11.0, 12.0], np.ones((3, 3)))
+    # 버퍼링되어 늦게 도착한 과거 샘플
+    buffer.extend([9.5, 10.5, 11.5], np.zeros((3, 3)))
+
+    t, xyz = buffer.snapshot()
+    assert t.tolist() == [10.0, 10.5, 11.0, 11.5, 12.0]
+    assert xyz[:, 0].tolist() == [1, 0, 1, 0, 1]
+    assert buffer.snapshot(1.0)[0].tolist() == [11.0, 11.5, 12.0]
+
+
+def test_in_order_samples_wrap_around():
+    buffer = RawAccelBuffer(capacity=3)
+    for i in range(5):
+        buffer.extend([float(i)], [(i, 0, 0)])
+    assert buffer.snapshot()[0].tolist() == [2.0, 3.0, 4.0]
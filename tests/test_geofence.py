@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+from geofence import GeofenceIndex
+
+SQUARE = [(37.0, 127.0), (37.0, 127.001), (37.001, 127.001), (37.001, 127.0)]
+BIGGER = [(36.999, 126.999), (36.999, 127.002), (37.002, 127.002), (37.002, 126.999)]
+
+
+def _index():
+    index = GeofenceIndex()
+    index._loaded = True
+    index.add(1, "user-1", SQUARE)
+    return index
+
+
+def _evaluate(index, lat, lon, was_inside=None):
+    return asyncio.run(index.evaluate(None, "user-1", lat, lon, datetime.utcnow(), was_inside))
+
+
+def test_state_changes_only_after_commit():
+    index = _index()
+    events, inside = _evaluate(index, 37.0005, 127.0005)
+    assert [e.event_type for e in events] == ["enter"]
+
+    # 커밋 실패 (committed 미호출) → 다음 위치에서 다시 진입 이벤트
+    events, inside = _evaluate(index, 37.0005, 127.0005)
+    assert [e.event_type for e in events] == ["enter"]
+
+    index.committed("user-1", inside)
+    events, _ = _evaluate(index, 37.0005, 127.0005)
+    assert events == []
+
+
+def test_replacing_fence_keeps_inside():
+    index = _index()
+    _, inside = _evaluate(index, 37.0005, 127.0005)
+    index.committed("user-1", inside)
+
+    index.add(1, "user-1", BIGGER)
+    events, _ = _evaluate(index, 37.0005, 127.0005)
+    assert events == []
+
+
+def test_removing_fence_drops_inside():
+    index = _index()
+    _, inside = _evaluate(index, 37.0005, 127.0005)
+    index.committed("user-1", inside)
+
+    index.remove(1)
+    assert index.inside("user-1") == set()
+
+
+def test_changing_owner_drops_old_users_inside():
+    index = _index()
+    _, inside = _evaluate(index, 37.0005, 127.0005)
+    index.committed("user-1", inside)
+
+    index.add(1, "user-2", SQUARE)
+    assert index.inside("user-1") == set()
+    events, _ = _evaluate(index, 37.0005, 127.0005)
+    assert events == []
@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime
+from hazards import HazardIndex
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """
+    ensure_loaded의 쿼리 순서(장애물 → 포트홀)대로 행을 돌려주는 DB 대역
+    """
+
+    def __init__(self, obstacle_rows, pothole_rows):
+        self._results = [obstacle_rows, pothole_rows]
+
+    async def execute(self, statement):
+        return FakeResult(self._results.pop(0))
+
+
+def test_add_before_load_is_not_duplicated():
+    now = datetime.utcnow()
+    row = ("obs-1", "user-1", "walker-1", "['person']", 37.5, 127.0, now)
+
+    index = HazardIndex()
+    # 첫 조회 전에 저장된 감지 (이미 커밋되어 DB 로드에도 포함됨)
+    index.add("obstacle", *row)
+    hazards = asyncio.run(index.near(FakeSession([row], []), 37.5, 127.0, 50))
+
+    assert len(hazards) == 1
+    assert hazards[0][0].hazard_id == "obs-1"
+
+
+def test_add_after_load_is_indexed():
+    now = datetime.utcnow()
+    index = HazardIndex()
+    asyncio.run(index.ensure_loaded(FakeSession([], [])))
+    index.add("pothole", "crack-1", "user-1", "walker-1", "['crack']", 37.5, 127.0, now)
+
+    hazards = asyncio.run(index.near(FakeSession([], []), 37.5, 127.0, 50, kind="pothole"))
+    assert [h.hazard_id for h, _ in hazards] == ["crack-1"]
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timedelta
+from motion import MotionTracker, MotionWindow
+
+START = datetime(2026, 1, 1, 9, 0, 0)
+
+
+def _tracker(*entries):
+    tracker = MotionTracker()
+    window = MotionWindow()
+    for timestamp, is_moving in entries:
+        window.push(timestamp, is_moving)
+    tracker._windows[("user-1", "walker-1")] = window
+    return tracker, window
+
+
+def test_decide_changes_window_only_after_commit():
+    tracker, window = _tracker((START, 0))
+    now = START + timedelta(seconds=1)
+    is_moving, _ = asyncio.run(tracker.decide(None, "user-1", "walker-1", 2.0, now))
+    assert is_moving == 1
+    assert window.last_timestamp == START
+
+    tracker.committed("user-1", "walker-1", [now], [is_moving])
+    assert window.last_timestamp == now
+    assert window.moving_count == 1
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, statement):
+        return FakeResult(self.rows)
+
+
+def test_late_batch_is_decided_from_its_own_time_range():
+    # 라이브 기록: 배치보다 나중의 움직임 샘플
+    later = START + timedelta(seconds=30)
+    tracker, window = _tracker((later, 1))
+    timestamps = [START + timedelta(seconds=i) for i in range(3)]
+    db = FakeSession([(START - timedelta(seconds=5), 0)])
+
+    is_moving = asyncio.run(tracker.decide_many(db, "user-1", "walker-1", [0.5, 0.5, 0.5], timestamps))
+    # 나중 샘플의 움직임이 과거 판정에 섞이지 않음
+    assert is_moving == [0, 0, 0]
+
+    tracker.committed("user-1", "walker-1", timestamps, is_moving)
+    assert list(window.entries) == [(later, 1)]
+
+
+def test_peek_ignores_stale_decision():
+    tracker, _ = _tracker((START, 1))
+    assert tracker.peek("user-1", "walker-1", now=START + timedelta(seconds=5)) == 1
+    assert tracker.peek("user-1", "walker-1", now=START + timedelta(seconds=60)) is None
+    assert tracker.peek("user-1", "walker-2") is None
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+from odometer import Odometer
+
+START = datetime(2026, 1, 1, 9, 0, 0)
+# 위도 0.0002도 ≈ 22m
+POINTS = [(37.0, 127.0), (37.0002, 127.0), (37.0004, 127.0)]
+
+
+def test_anchor_changes_only_after_commit():
+    odometer = Odometer()
+    _, anchor = odometer.step("user-1", *POINTS[0], START)
+    odometer.committed("user-1", {}, anchor)
+
+    moved, _ = odometer.step("user-1", *POINTS[1], START + timedelta(seconds=30))
+    assert moved > 0
+
+    # 커밋 실패 (committed 미호출) → 다음 위치는 커밋된 기준점에서 측정
+    retried, anchor = odometer.step("user-1", *POINTS[1], START + timedelta(seconds=30))
+    assert retried == moved
+    odometer.committed("user-1", {}, anchor)
+    assert odometer.step("user-1", *POINTS[1], START + timedelta(seconds=60))[0] == 0.0
+
+
+def test_anchor_chains_within_request():
+    odometer = Odometer()
+    anchor = None
+    total = 0.0
+    for i, point in enumerate(POINTS):
+        moved, anchor = odometer.step("user-1", *point, START + timedelta(seconds=30 * i), anchor=anchor)
+        total += moved
+    assert 40 < total < 50
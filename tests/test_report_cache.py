@@ -0,0 +1,42 @@
+from report_cache import ReportCache
+
+
+def test_invalidate_drops_cached_and_in_flight_results():
+    cache = ReportCache()
+    generation = cache.generation("user-1")
+    cache.put("user-1", ("report", 1), "old", generation)
+    assert cache.get("user-1", "report", 1) == "old"
+
+    in_flight = cache.generation("user-1")
+    cache.invalidate("user-1")
+    assert cache.get("user-1", "report", 1) is None
+
+    # 무효화 전에 시작된 계산 결과는 저장하지 않음
+    cache.put("user-1", ("report", 1), "stale", in_flight)
+    assert cache.get("user-1", "report", 1) is None
+
+    cache.put("user-1", ("report", 1), "new", cache.generation("user-1"))
+    assert cache.get("user-1", "report", 1) == "new"
+
+
+def test_invalidation_history_is_bounded():
+    cache = ReportCache(history=2)
+    cache.put("user-1", ("report",), "old", cache.generation("user-1"))
+    for user_id in ("user-1", "user-2", "user-3"):
+        cache.invalidate(user_id)
+
+    assert len(cache._invalidated) == 2
+    # 기록에서 밀려난 사용자도 무효화 이전 값은 쓰지 않음
+    assert cache.get("user-1", "report") is None
+
+
+def test_stale_entry_counts_as_miss():
+    cache = ReportCache(maxsize=10)
+    cache.put("user-1", ("report",), "old", cache.generation("user-1"))
+    cache.invalidate("user-1")
+    assert cache.get("user-1", "report") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (0, 1, 1)
+    assert stats["size"] == 0
+    assert stats["max_size"] == 10
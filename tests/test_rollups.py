@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, date
+from rollups import AccelRollupAccumulator
+
+SECOND = datetime(2026, 1, 1, 3, 0, 0)   # KST 2026-01-01 12:00
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class FakeSession:
+    """
+    반영 후 accelerometer_rollup_1s 행 (user_id, walker_id, bucket_start, moving_count)을 돌려주는 DB 대역
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, statement):
+        return FakeResult(self.rows)
+
+
+def test_two_walkers_moving_in_same_second_count_once():
+    rollups = AccelRollupAccumulator()
+    rollups.add("user-1", "walker-1", SECOND, 1.5, 1)
+    rollups.add("user-1", "walker-2", SECOND, 1.5, 1)
+    buckets = rollups.drain()
+    db = FakeSession([("user-1", "walker-1", SECOND, 1), ("user-1", "walker-2", SECOND, 1)])
+
+    moving = asyncio.run(rollups._new_moving_seconds(db, buckets))
+    assert moving == {("user-1", date(2026, 1, 1)): 1}
+
+
+def test_second_already_moving_on_other_walker_is_not_counted():
+    rollups = AccelRollupAccumulator()
+    rollups.add("user-1", "walker-2", SECOND, 1.5, 1)
+    buckets = rollups.drain()
+    # walker-1은 이전 반영에서 이미 같은 초에 움직임
+    db = FakeSession([("user-1", "walker-1", SECOND, 3), ("user-1", "walker-2", SECOND, 1)])
+
+    assert asyncio.run(rollups._new_moving_seconds(db, buckets)) == {}
@@ -1,6 +1,9 @@
 # utils.py
+from datetime import datetime, date, timedelta, timezone
 from sqlalchemy.ext.declarative import DeclarativeMeta
 
+KST = timezone(timedelta(hours=9))
+
 def sqlalchemy_to_dict(obj):
     """
     SQLAlchemy 객체를 dict로 변환
@@ -20,3 +23,10 @@ def detect_abnormal_heartrate(heartrate):
     elif heartrate > normal_range[1]:
         return "high"
     return "normal"
+
+def kst_day(timestamp: datetime) -> date:
+    """
+    naive UTC 시각 → KST 날짜
+    """
+    return timestamp.replace(tzinfo=timezone.utc).astimezone(KST).date()
+